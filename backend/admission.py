@@ -0,0 +1,110 @@
+import math
+import time
+from collections import OrderedDict
+
+ADMISSION_REJECT = "reject"
+ADMISSION_DEGRADE = "degrade"
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing more LLM work while the gateway is saturated"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM capacity exhausted, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: ``rate_per_second`` sustained, up to ``burst`` at once.
+
+    Buckets of clients that have gone quiet are dropped least-recently-used
+    first once ``max_clients`` are tracked; a dropped client simply starts
+    again with a full bucket.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_clients: int = 10000):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.stats = {"allowed": 0, "limited": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def acquire(self, client: str) -> float:
+        """Take a token for ``client``; returns 0 when allowed, else seconds until one is available"""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [float(self.burst), now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.stats["allowed"] += 1
+            return 0.0
+        self.stats["limited"] += 1
+        return (1 - bucket[0]) / self.rate_per_second
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "clients": len(self._buckets),
+            "rate_per_second": self.rate_per_second,
+            "burst": self.burst,
+        }
+
+
+class AdmissionController:
+    """Decides whether new LLM work may join the gateway queue.
+
+    Work is shed once too many calls are already waiting for a gateway slot,
+    or once the oldest of them has waited too long. Both signals come from
+    the queue as it is right now, so admission resumes as soon as it drains.
+    """
+
+    def __init__(self, gateway, max_waiting: int = 32, max_queue_wait_seconds: float = 5.0, mode: str = ADMISSION_DEGRADE):
+        self.gateway = gateway
+        self.max_waiting = max_waiting
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.mode = mode
+        self.stats = {"admitted": 0, "rejected": 0, "degraded": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_waiting > 0 or self.max_queue_wait_seconds > 0
+
+    def overloaded(self) -> bool:
+        if self.max_waiting > 0 and self.gateway.waiting >= self.max_waiting:
+            return True
+        return self.max_queue_wait_seconds > 0 and self.gateway.queue_wait() >= self.max_queue_wait_seconds
+
+    def retry_after(self) -> int:
+        # Roughly how long the current queue takes to drain through the gateway's slots
+        latency = self.gateway.latency_percentile(50) or self.gateway.timeout_seconds
+        return max(1, math.ceil(latency * (self.gateway.waiting + 1) / self.gateway.max_concurrency))
+
+    def admit(self):
+        """Raise Overloaded if new work should be shed; the caller decides how to degrade"""
+        if self.enabled and self.overloaded():
+            self.stats["rejected" if self.mode == ADMISSION_REJECT else "degraded"] += 1
+            raise Overloaded(self.retry_after())
+        self.stats["admitted"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "mode": self.mode,
+            "max_waiting": self.max_waiting,
+            "max_queue_wait_seconds": self.max_queue_wait_seconds,
+            "overloaded": self.enabled and self.overloaded(),
+        }
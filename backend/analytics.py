@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Optional
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from roadmap_cache import canonical_profile
+
+# Dimensions counted per form; "totals" holds plain document counts
+FORM_DIMENSIONS = ("career_interest", "year", "learning_style", "degree")
+SKILLS = "skills"
+TOTALS = "totals"
+# Free-text values longer than this are truncated before they become rollup keys
+MAX_VALUE_LENGTH = 100
+
+FORM_PROJECTION = {"_id": 0, "timestamp": 1, **{field: 1 for field in (*FORM_DIMENSIONS, SKILLS)}}
+ROADMAP_PROJECTION = {"_id": 0, "timestamp": 1, "degraded": 1}
+
+
+def form_counts(form) -> Counter:
+    """Rollup increments for one career form (a model or a stored document)"""
+    if isinstance(form, dict):
+        form = SimpleNamespace(**{field: form.get(field, "") for field in (*FORM_DIMENSIONS, SKILLS)})
+    profile = canonical_profile(form)
+    counts = Counter({(TOTALS, "forms"): 1})
+    for dimension in FORM_DIMENSIONS:
+        if profile[dimension]:
+            counts[(dimension, profile[dimension][:MAX_VALUE_LENGTH])] += 1
+    for skill in profile[SKILLS]:
+        counts[(SKILLS, skill[:MAX_VALUE_LENGTH])] += 1
+    return counts
+
+
+def roadmap_counts(degraded: bool = False) -> Counter:
+    counts = Counter({(TOTALS, "roadmaps"): 1})
+    if degraded:
+        counts[(TOTALS, "degraded_roadmaps")] += 1
+    return counts
+
+
+def rollup_id(dimension: str, value: str) -> str:
+    return f"{dimension}:{value}"
+
+
+class AnalyticsRollups:
+    """Materialized counts over career_forms and career_roadmaps.
+
+    One small document per (dimension, value) carries a running count.
+    Submissions add to an in-process tally that a background flusher writes
+    every ``flush_interval`` seconds as one unordered batch of ``$inc``
+    upserts, so no request waits on analytics. ``summary`` reads the top
+    values of each dimension off a (dimension, count) index, which costs
+    the same however many forms are stored.
+
+    ``rebuild`` recounts everything with streaming cursors. It counts
+    documents up to a cut-off time and holds back flushes until it is done;
+    anything recorded with a later timestamp stays in the tally and is
+    added on top afterwards.
+    """
+
+    def __init__(self, collection, flush_interval: float = 1.0, batch_size: int = 1000):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = Counter()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+        self._rebuild_task = None
+        self._cutoff: Optional[datetime] = None
+        self.rebuild_status = {"state": "idle"}
+        self.stats = {"recorded": 0, "skipped": 0, "flushes": 0, "upserts": 0, "errors": 0}
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("dimension", 1), ("count", DESCENDING)])
+
+    def _record(self, counts: Counter, timestamp: Optional[datetime]):
+        # While rebuilding, documents before the cut-off are already being counted by the scan
+        if self._cutoff is not None and timestamp is not None and timestamp <= self._cutoff:
+            self.stats["skipped"] += 1
+            return
+        self._pending.update(counts)
+        self.stats["recorded"] += 1
+        if self._task is None and not self._stopping and self.flush_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    def record_form(self, form):
+        self._record(form_counts(form), getattr(form, "timestamp", None))
+
+    def record_roadmap(self, roadmap):
+        self._record(roadmap_counts(roadmap.degraded), roadmap.timestamp)
+
+    async def _run(self):
+        while not self._stopping:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Analytics rollup flush failed: {str(e)}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, Counter()
+            items = list(pending.items())
+            now = datetime.utcnow()
+            requests = [
+                UpdateOne(
+                    {"_id": rollup_id(dimension, value)},
+                    {"$inc": {"count": count}, "$set": {"updated_at": now}, "$setOnInsert": {"dimension": dimension, "value": value}},
+                    upsert=True,
+                )
+                for (dimension, value), count in items
+            ]
+            self.stats["flushes"] += 1
+            try:
+                await self.collection.bulk_write(requests, ordered=False)
+                self.stats["upserts"] += len(requests)
+            except BulkWriteError as e:
+                # Unordered: everything but the reported writes was applied
+                failed = [error["index"] for error in e.details.get("writeErrors", [])]
+                self.stats["errors"] += len(failed)
+                self._pending.update({items[index][0]: items[index][1] for index in failed})
+                raise
+            except Exception:
+                # Nothing is known to have been applied; keep the counts for the next flush
+                self.stats["errors"] += len(requests)
+                self._pending.update(pending)
+                raise
+
+    async def summary(self, top: int = 20) -> dict:
+        async def top_values(dimension):
+            cursor = self.collection.find({"dimension": dimension}, {"_id": 0, "value": 1, "count": 1})
+            return [doc async for doc in cursor.sort("count", DESCENDING).limit(top)]
+
+        dimensions = (*FORM_DIMENSIONS, SKILLS)
+        totals, *ranked = await asyncio.gather(
+            self.collection.find({"dimension": TOTALS}, {"_id": 0, "value": 1, "count": 1}).to_list(None),
+            *(top_values(dimension) for dimension in dimensions),
+        )
+        return {
+            "totals": {doc["value"]: doc["count"] for doc in totals},
+            **dict(zip(dimensions, ranked)),
+            # Recorded but not yet flushed; summaries lag by at most one flush interval
+            "pending_forms": self._pending.get((TOTALS, "forms"), 0),
+            "rebuild": dict(self.rebuild_status),
+        }
+
+    def start_rebuild(self, forms, roadmaps) -> bool:
+        """Rebuild in the background; False if a rebuild is already running"""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return False
+        self._rebuild_task = asyncio.create_task(self._rebuild_logged(forms, roadmaps))
+        return True
+
+    async def _rebuild_logged(self, forms, roadmaps):
+        try:
+            await self.rebuild(forms, roadmaps)
+        except Exception as e:
+            logging.error(f"Analytics rollup rebuild failed: {str(e)}")
+
+    async def rebuild(self, forms, roadmaps):
+        started = time.perf_counter()
+        async with self._lock:
+            cutoff = self._cutoff = datetime.utcnow()
+            # Everything tallied so far was stored before the cut-off, so the scan counts it
+            self._pending = Counter()
+            self.rebuild_status = {"state": "running", "cutoff": cutoff.isoformat(), "forms": 0, "roadmaps": 0}
+            try:
+                counts = Counter()
+                query = {"timestamp": {"$lte": cutoff}}
+                async for form in forms.find(query, FORM_PROJECTION).batch_size(self.batch_size):
+                    counts.update(form_counts(form))
+                    self.rebuild_status["forms"] += 1
+                async for roadmap in roadmaps.find(query, ROADMAP_PROJECTION).batch_size(self.batch_size):
+                    counts.update(roadmap_counts(roadmap.get("degraded", False)))
+                    self.rebuild_status["roadmaps"] += 1
+
+                # Overwrite every counted value, then drop values that no longer occur
+                generation = uuid.uuid4().hex
+                now = datetime.utcnow()
+                items = list(counts.items())
+                for start in range(0, len(items), self.batch_size):
+                    await self.collection.bulk_write(
+                        [
+                            UpdateOne(
+                                {"_id": rollup_id(dimension, value)},
+                                {"$set": {"dimension": dimension, "value": value, "count": count, "updated_at": now, "generation": generation}},
+                                upsert=True,
+                            )
+                            for (dimension, value), count in items[start:start + self.batch_size]
+                        ],
+                        ordered=False,
+                    )
+                await self.collection.delete_many({"generation": {"$ne": generation}})
+                self.rebuild_status.update(
+                    state="completed", seconds=round(time.perf_counter() - started, 3), values=len(items)
+                )
+            except Exception as e:
+                self.rebuild_status.update(state="failed", error=str(e))
+                raise
+            finally:
+                self._cutoff = None
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still tallied"""
+        self._stopping = True
+        for task in (self._task, self._rebuild_task):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "pending_values": len(self._pending), "flush_interval": self.flush_interval}
@@ -0,0 +1,71 @@
+import asyncio
+import os
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+class DatabaseNotConnected(RuntimeError):
+    """Raised when a collection is used before the lifespan has connected MongoDB"""
+
+
+class LazyCollection:
+    """Handle to a collection that resolves to the Motor collection on every use.
+
+    Lets module-level code (caches, queues, write buffers) hold collections
+    before a connection exists; nothing touches MongoDB until a method is called.
+    """
+
+    def __init__(self, database: "LazyDatabase", name: str):
+        self._database = database
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._database.resolve()[self.name], attr)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self.name!r})"
+
+
+class LazyDatabase:
+    """The application's MongoDB database, connected during application startup"""
+
+    def __init__(self):
+        self.client = None
+        self._database = None
+
+    @property
+    def connected(self) -> bool:
+        return self._database is not None
+
+    def connect(self, url: Optional[str] = None, name: Optional[str] = None, min_pool_size: int = 0):
+        url = url or os.environ.get('MONGO_URL')
+        name = name or os.environ.get('DB_NAME')
+        if not url or not name:
+            raise DatabaseNotConnected("MONGO_URL and DB_NAME must both be set")
+        self.client = AsyncIOMotorClient(url, minPoolSize=min_pool_size)
+        self._database = self.client[name]
+
+    async def warm_up(self, timeout_seconds: float = 10.0):
+        """Round-trip to the server so the first request does not pay for connection setup"""
+        try:
+            await asyncio.wait_for(self.resolve().command("ping"), timeout_seconds)
+        except asyncio.TimeoutError:
+            raise DatabaseNotConnected(f"MongoDB did not answer a ping within {timeout_seconds}s")
+
+    def resolve(self):
+        if self._database is None:
+            raise DatabaseNotConnected("MongoDB is not connected yet")
+        return self._database
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(self, name)
+
+    def __getattr__(self, name: str) -> LazyCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return LazyCollection(self, name)
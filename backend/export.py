@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from resource_store import STORAGE_NORMALIZED
+
+EXPORT_NDJSON = "ndjson"
+EXPORT_PARQUET = "parquet"
+EXPORT_FORMATS = (EXPORT_NDJSON, EXPORT_PARQUET)
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Stored bodies are a serving detail; "storage" stays so normalized roadmaps can be expanded
+ROADMAP_PROJECTION = {"_id": 0, "blob": 0, "blob_encoding": 0, "etag": 0}
+# Columns every Parquet row carries besides the phase itself
+PHASE_META = [
+    "form_id", "form_timestamp", "degree", "year", "skills", "career_interest", "learning_style",
+    "roadmap_id", "revision", "degraded", "roadmap_timestamp", "job_roles", "example_companies", "interview_topics",
+]
+
+
+def encode_cursor(form: dict) -> str:
+    """Resume point just after ``form`` in export order; the same shape as status check cursors"""
+    return base64.urlsafe_b64encode(f"{form['timestamp']}|{form['id']}".encode()).decode()
+
+
+def export_query(since: Optional[datetime] = None, until: Optional[datetime] = None, after: Optional[str] = None) -> dict:
+    """Forms submitted in [since, until), after the ``after`` cursor; ValueError for a bad cursor"""
+    clauses = []
+    if since is not None:
+        clauses.append({"timestamp": {"$gte": since}})
+    if until is not None:
+        clauses.append({"timestamp": {"$lt": until}})
+    if after:
+        timestamp, last_id = base64.urlsafe_b64decode(after.encode()).decode().split("|", 1)
+        timestamp = datetime.fromisoformat(timestamp)
+        clauses.append({"$or": [{"timestamp": {"$gt": timestamp}}, {"timestamp": timestamp, "id": {"$gt": last_id}}]})
+    return {"$and": clauses} if clauses else {}
+
+
+async def export_batches(forms, roadmaps, query: dict, batch_size: int = 1000, resource_store=None) -> AsyncIterator[List[dict]]:
+    """Forms in (timestamp, id) order, ``batch_size`` at a time, each with its roadmaps attached.
+
+    Only one batch is held at a time, so memory stays flat however many
+    forms match. Every form carries the cursor that resumes after it.
+    """
+    cursor = forms.find(query, {"_id": 0}).sort([("timestamp", 1), ("id", 1)]).batch_size(batch_size)
+    batch = []
+    async for form in cursor:
+        batch.append(form)
+        if len(batch) >= batch_size:
+            yield await _attach_roadmaps(roadmaps, batch, batch_size, resource_store)
+            batch = []
+    if batch:
+        yield await _attach_roadmaps(roadmaps, batch, batch_size, resource_store)
+
+
+async def _attach_roadmaps(roadmaps, batch: List[dict], batch_size: int, resource_store) -> List[dict]:
+    by_form = {form["id"]: [] for form in batch}
+    cursor = roadmaps.find({"form_id": {"$in": list(by_form)}}, ROADMAP_PROJECTION).batch_size(batch_size)
+    async for roadmap in cursor:
+        if roadmap.get("storage") == STORAGE_NORMALIZED:
+            if resource_store is None:
+                raise ValueError("Normalized roadmaps need a resource store to export")
+            roadmap = await resource_store.expand(roadmap)
+        by_form[roadmap["form_id"]].append(roadmap)
+    for form in batch:
+        # Original first, then PATCH revisions in order
+        form["roadmaps"] = sorted(by_form[form["id"]], key=lambda roadmap: (roadmap.get("revision", 1), roadmap["timestamp"]))
+        form["cursor"] = encode_cursor(form)
+    return batch
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(batch: List[dict]) -> str:
+    """One line per form, roadmaps nested exactly as stored"""
+    return "".join(json.dumps(form, default=_json_default) + "\n" for form in batch)
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[dict]]):
+    async for batch in batches:
+        yield ndjson_lines(batch)
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    resource = pa.struct([("title", pa.string()), ("type", pa.string()), ("url", pa.string())])
+    project = pa.struct([("title", pa.string()), ("description", pa.string()), ("difficulty", pa.string())])
+    return pa.schema([
+        ("form_id", pa.string()),
+        ("form_timestamp", pa.timestamp("ms")),
+        ("degree", pa.string()),
+        ("year", pa.string()),
+        ("skills", pa.string()),
+        ("career_interest", pa.string()),
+        ("learning_style", pa.string()),
+        ("roadmap_id", pa.string()),
+        ("revision", pa.int64()),
+        ("degraded", pa.bool_()),
+        ("roadmap_timestamp", pa.timestamp("ms")),
+        ("job_roles", pa.list_(pa.string())),
+        ("example_companies", pa.list_(pa.string())),
+        ("interview_topics", pa.list_(pa.string())),
+        ("phase_index", pa.int64()),
+        ("phase", pa.string()),
+        ("focus_areas", pa.list_(pa.string())),
+        ("learning_resources", pa.list_(resource)),
+        ("projects", pa.list_(project)),
+    ])
+
+
+def phase_table(batch: List[dict], schema):
+    """Flatten a batch to one row per roadmap phase; forms without a roadmap yet have no rows"""
+    import pandas as pd
+    import pyarrow as pa
+
+    records = [
+        {
+            "form_id": form["id"],
+            "form_timestamp": form["timestamp"],
+            **{field: form.get(field) for field in ("degree", "year", "skills", "career_interest", "learning_style")},
+            "roadmap_id": roadmap["id"],
+            "revision": roadmap.get("revision", 1),
+            "degraded": roadmap.get("degraded", False),
+            "roadmap_timestamp": roadmap["timestamp"],
+            "job_roles": roadmap.get("job_roles", []),
+            "example_companies": roadmap.get("example_companies", []),
+            "interview_topics": roadmap.get("interview_prep", {}).get("important_topics", []),
+            "roadmap": roadmap.get("roadmap", []),
+        }
+        for form in batch
+        for roadmap in form["roadmaps"]
+    ]
+    if not records:
+        return schema.empty_table()
+    frame = pd.json_normalize(records, record_path="roadmap", meta=PHASE_META)
+    frame["phase_index"] = frame.groupby("roadmap_id", sort=False).cumcount()
+    return pa.Table.from_pandas(frame.reindex(columns=schema.names), schema=schema, preserve_index=False)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def parquet_chunks(batches: AsyncIterator[List[dict]], compression: str = "snappy"):
+    """A single Parquet file, streamed one row group per batch"""
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        async for batch in batches:
+            table = phase_table(batch, schema)
+            if table.num_rows:
+                writer.write_table(table)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pandas  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Command line export with resumable checkpoints
+
+def _write_checkpoint(path: Path, checkpoint: dict):
+    # Replace atomically so a crash never leaves a half-written checkpoint
+    temporary = path.with_suffix(path.suffix + ".tmp")
+    temporary.write_text(json.dumps(checkpoint))
+    os.replace(temporary, path)
+
+
+async def export_ndjson_file(batches, output: Path, checkpoint_path: Path, checkpoint: dict) -> dict:
+    mode = "r+b" if output.exists() else "wb"
+    with open(output, mode) as file:
+        # Lines written after the last checkpoint are written again on resume
+        file.truncate(checkpoint.get("bytes", 0))
+        file.seek(checkpoint.get("bytes", 0))
+        async for batch in batches:
+            file.write(ndjson_lines(batch).encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+            checkpoint.update(after=batch[-1]["cursor"], forms=checkpoint.get("forms", 0) + len(batch), bytes=file.tell())
+            _write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+async def export_parquet_parts(batches, output: Path, checkpoint_path: Path, checkpoint: dict, forms_per_file: int) -> dict:
+    """Parquet parts of about ``forms_per_file`` forms; only completed parts are checkpointed"""
+    import pyarrow.parquet as pq
+
+    output.mkdir(parents=True, exist_ok=True)
+    schema = parquet_schema()
+    writer = None
+    part_forms = 0
+    part_path = None
+
+    def finish_part(last_cursor: str):
+        writer.close()
+        os.replace(part_path.with_suffix(".parquet.tmp"), part_path)
+        checkpoint.update(after=last_cursor, forms=checkpoint.get("forms", 0) + part_forms, parts=checkpoint.get("parts", 0) + 1)
+        _write_checkpoint(checkpoint_path, checkpoint)
+        logging.info(f"Wrote {part_path} ({part_forms} forms)")
+
+    last_cursor = None
+    async for batch in batches:
+        if writer is None:
+            part_path = output / f"part-{checkpoint.get('parts', 0):05d}.parquet"
+            writer = pq.ParquetWriter(str(part_path.with_suffix(".parquet.tmp")), schema, compression="snappy")
+            part_forms = 0
+        table = phase_table(batch, schema)
+        if table.num_rows:
+            writer.write_table(table)
+        part_forms += len(batch)
+        last_cursor = batch[-1]["cursor"]
+        if part_forms >= forms_per_file:
+            finish_part(last_cursor)
+            writer = None
+    if writer is not None:
+        finish_part(last_cursor)
+    return checkpoint
+
+
+async def run_export(args) -> dict:
+    from dotenv import load_dotenv
+
+    from database import LazyDatabase
+    from resource_store import ResourceStore
+
+    load_dotenv(Path(__file__).parent / '.env')
+    db = LazyDatabase()
+    db.connect()
+    output = Path(args.output)
+    checkpoint_path = Path(args.checkpoint or f"{output}.checkpoint.json")
+    filters = {"format": args.format, "since": args.since, "until": args.until}
+
+    checkpoint = dict(filters)
+    if checkpoint_path.exists():
+        checkpoint = json.loads(checkpoint_path.read_text())
+        if any(checkpoint.get(key) != value for key, value in filters.items()):
+            raise SystemExit(f"{checkpoint_path} belongs to an export with different options; remove it to start over")
+        logging.info(f"Resuming after {checkpoint.get('forms', 0)} forms")
+
+    query = export_query(
+        datetime.fromisoformat(args.since) if args.since else None,
+        datetime.fromisoformat(args.until) if args.until else None,
+        checkpoint.get("after"),
+    )
+    batches = export_batches(db.career_forms, db.career_roadmaps, query, args.batch_size, ResourceStore(db.roadmap_resources))
+    started = time.perf_counter()
+    try:
+        if args.format == EXPORT_PARQUET:
+            checkpoint = await export_parquet_parts(batches, output, checkpoint_path, checkpoint, args.forms_per_file)
+        else:
+            checkpoint = await export_ndjson_file(batches, output, checkpoint_path, checkpoint)
+    finally:
+        db.close()
+    return {"output": str(output), "forms": checkpoint.get("forms", 0), "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export career forms joined with their roadmaps")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=EXPORT_NDJSON)
+    parser.add_argument("--output", required=True, help="NDJSON file, or directory of Parquet parts")
+    parser.add_argument("--since", help="Only forms submitted at or after this ISO timestamp")
+    parser.add_argument("--until", help="Only forms submitted before this ISO timestamp")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Forms per cursor batch and roadmap lookup")
+    parser.add_argument("--forms-per-file", type=int, default=100000, help="Forms per Parquet part")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(asyncio.run(run_export(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import json
+import marshal
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+TEMPLATES_DIR = Path(__file__).parent / "fallback_templates"
+DEFAULT_TRACK = "general"
+
+# Lowercase words, keeping the punctuation of names like c++, c# and node.js
+TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9]+)*")
+# Longest keyword phrase matched, in words ("natural language processing")
+MAX_PHRASE_WORDS = 3
+# A career interest says far more about the track than any single skill does
+INTEREST_WEIGHT = 3
+SKILL_WEIGHT = 1
+
+
+def phrases(text: str):
+    """Every run of up to MAX_PHRASE_WORDS consecutive words in ``text``"""
+    words = TOKEN_RE.findall(text.lower())
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + MAX_PHRASE_WORDS, len(words)) + 1):
+            yield " ".join(words[start:end])
+
+
+def _pick_resources(pool: list, preferred_types: list, count: int) -> list:
+    if preferred_types:
+        rank = {resource_type: index for index, resource_type in enumerate(preferred_types)}
+        return sorted(pool, key=lambda resource: rank.get(resource["type"], len(rank)))[:count]
+    # No preference: one resource of each type in turn, in the order they were written
+    by_type = {}
+    for resource in pool:
+        by_type.setdefault(resource["type"], []).append(resource)
+    picked = []
+    while len(picked) < count and any(by_type.values()):
+        for resources in by_type.values():
+            if resources and len(picked) < count:
+                picked.append(resources.pop(0))
+    return picked
+
+
+class FallbackRoadmap(NamedTuple):
+    track: str
+    style: str
+    # Every caller edits or stores its roadmap, so only a snapshot to copy from is kept;
+    # marshal rebuilds plain dicts and lists several times faster than json.loads
+    marshalled: bytes
+
+    def to_dict(self) -> dict:
+        """A private, mutable copy for callers that edit or store the roadmap"""
+        return marshal.loads(self.marshalled)
+
+
+class FallbackEngine:
+    """Template roadmaps served whenever AI generation is unavailable.
+
+    Every track is rendered for every learning style once, at load time, so
+    serving a fallback is a classification plus a dictionary lookup. The
+    classifier scores tracks by the keyword phrases found in the career
+    interest and, with less weight, in the skills; whole words are matched,
+    so "retail" never counts as "ai".
+    """
+
+    def __init__(self, tracks: list, styles: dict, default_style: str, max_classified: int = 4096):
+        self.tracks = [track["id"] for track in tracks]
+        if DEFAULT_TRACK not in self.tracks:
+            raise ValueError(f"Fallback templates need a {DEFAULT_TRACK!r} track")
+        self.default_style = default_style
+        self._style_aliases = {}
+        for style, config in styles.items():
+            for alias in [style, *config.get("aliases", [])]:
+                self._style_aliases[alias.lower()] = style
+
+        self._interest_index = {}
+        self._skill_index = {}
+        for track in tracks:
+            for index, field in ((self._interest_index, "keywords"), (self._skill_index, "skills")):
+                for keyword in track.get(field, []):
+                    phrase = " ".join(TOKEN_RE.findall(keyword.lower()))
+                    index.setdefault(phrase, set()).add(track["id"])
+
+        self._rendered = {}
+        for track in tracks:
+            for style, config in styles.items():
+                roadmap = self._render(track, config)
+                self._rendered[(track["id"], style)] = FallbackRoadmap(track["id"], style, marshal.dumps(roadmap))
+        self.stats = {track_id: 0 for track_id in self.tracks}
+
+        # Career interests come from a short list and skills repeat, so most forms classify from here
+        self.max_classified = max_classified
+        self._classified: "OrderedDict[tuple, str]" = OrderedDict()
+
+    @classmethod
+    def load(cls, directory: Path = TEMPLATES_DIR) -> "FallbackEngine":
+        """Read one JSON file per track from ``directory/tracks`` plus ``directory/styles.json``"""
+        directory = Path(directory)
+        tracks = [json.loads(path.read_text(encoding="utf-8")) for path in sorted((directory / "tracks").glob("*.json"))]
+        styles = json.loads((directory / "styles.json").read_text(encoding="utf-8"))
+        return cls(tracks, styles["styles"], styles["default"])
+
+    @staticmethod
+    def _render(track: dict, style: dict) -> dict:
+        return {
+            "roadmap": [
+                {
+                    "phase": phase["phase"],
+                    "focus_areas": phase["focus_areas"],
+                    "learning_resources": _pick_resources(phase["learning_resources"], style["resource_types"], style["resources_per_phase"]),
+                    "projects": phase["projects"][:style["projects_per_phase"]],
+                }
+                for phase in track["roadmap"]
+            ],
+            "job_roles": track["job_roles"],
+            "example_companies": track["example_companies"],
+            "interview_prep": track["interview_prep"],
+        }
+
+    def classify(self, career_interest: str, skills: str = "") -> str:
+        key = (career_interest, skills)
+        track = self._classified.get(key)
+        if track is None:
+            track = self._classified[key] = self._score(career_interest, skills)
+            while len(self._classified) > self.max_classified:
+                self._classified.popitem(last=False)
+        else:
+            self._classified.move_to_end(key)
+        return track
+
+    def _score(self, career_interest: str, skills: str) -> str:
+        scores = {}
+        for text, index, weight in ((career_interest, self._interest_index, INTEREST_WEIGHT), (skills, self._skill_index, SKILL_WEIGHT)):
+            for phrase in set(phrases(text)):
+                for track_id in index.get(phrase, ()):
+                    scores[track_id] = scores.get(track_id, 0) + weight
+        if not scores:
+            return DEFAULT_TRACK
+        # Ties go to the first track in file-name order, so classification is stable across runs
+        return max(self.tracks, key=lambda track_id: scores.get(track_id, 0))
+
+    def style(self, learning_style: str) -> str:
+        return self._style_aliases.get(learning_style.strip().lower(), self.default_style)
+
+    def render(self, career_interest: str, skills: str = "", learning_style: str = "") -> FallbackRoadmap:
+        track = self.classify(career_interest, skills)
+        self.stats[track] += 1
+        return self._rendered[(track, self.style(learning_style))]
+
+    def snapshot(self) -> dict:
+        return {
+            "tracks": len(self.tracks),
+            "variants": len(self._rendered),
+            "classified_entries": len(self._classified),
+            "served": dict(self.stats),
+        }
+
+
+def benchmark(iterations: int = 100000) -> dict:
+    """Fallbacks served per second on a single core"""
+    import time
+
+    engine = FallbackEngine.load()
+    forms = [
+        ("ai-ml", "Python, NumPy", "videos"),
+        ("Web Development", "HTML, CSS, JavaScript, React", "projects"),
+        ("retail management", "customer service, excel", "books"),
+        ("data-science", "SQL, Tableau", "courses"),
+        ("supply chain", "logistics", "mixed"),
+        ("cybersecurity", "Linux, networking, Wireshark", "Hands-on Projects"),
+    ]
+    report = {}
+    for name, serve in (("render", lambda form: engine.render(*form)), ("render_to_dict", lambda form: engine.render(*form).to_dict())):
+        started = time.perf_counter()
+        for index in range(iterations):
+            serve(forms[index % len(forms)])
+        report[f"{name}_per_second"] = round(iterations / (time.perf_counter() - started))
+    report["classified"] = {form[0]: engine.classify(form[0], form[1]) for form in forms}
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
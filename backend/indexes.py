@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, IndexModel
+
+# Every index the application relies on, by collection
+INDEXES = {
+    "career_roadmaps": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("form_id", ASCENDING)], name="form_id"),
+    ],
+    "career_forms": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Exports walk forms in (timestamp, id) order and resume from a cursor
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id"),
+    ],
+    "status_checks": [
+        # Keyset pagination walks (timestamp, id) in order
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id"),
+    ],
+}
+
+# TTL indexes are managed by apply_retention rather than declared above
+RETENTION_INDEX_SUFFIX = "_ttl"
+# An index is only reported unused once its access counter has been running this long
+UNUSED_AFTER = timedelta(days=1)
+
+
+async def ensure_indexes(db) -> dict:
+    """Create the declared indexes, then report what is missing.
+
+    Usage is not checked here: access counters restart with the server and
+    for new indexes, so right after startup every index would look unused.
+    """
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except Exception as e:
+            logging.error(f"Failed to create indexes on {collection_name}: {str(e)}")
+    return await index_report(db, check_usage=False)
+
+
+async def index_report(db, check_usage: bool = True, unused_after: timedelta = UNUSED_AFTER) -> dict:
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        declared = {index.document["name"] for index in indexes}
+        entry = {"missing": [], "unused": [], "undeclared": []}
+        try:
+            existing = set()
+            async for index in db[collection_name].list_indexes():
+                existing.add(index["name"])
+            entry["missing"] = sorted(declared - existing)
+            entry["undeclared"] = sorted(
+                name for name in existing - declared - {"_id_"}
+                if not name.endswith(RETENTION_INDEX_SUFFIX)
+            )
+
+            if check_usage:
+                # $indexStats counts accesses since the server started or the index was built
+                observed_since = datetime.utcnow() - unused_after
+                async for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+                    since = stats["accesses"]["since"].replace(tzinfo=None)
+                    if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0 and since <= observed_since:
+                        entry["unused"].append(stats["name"])
+                entry["unused"].sort()
+        except Exception as e:
+            entry["error"] = str(e)
+        report[collection_name] = entry
+
+        if entry["missing"]:
+            logging.warning(f"Missing indexes on {collection_name}: {', '.join(entry['missing'])}")
+        if entry["unused"]:
+            logging.warning(f"Unused indexes on {collection_name}: {', '.join(entry['unused'])}")
+    return report
+
+
+async def apply_retention(collection, field: str, seconds: int):
+    """Expire documents ``seconds`` after ``field`` via a TTL index; 0 disables retention"""
+    name = f"{field}{RETENTION_INDEX_SUFFIX}"
+    existing = None
+    async for index in collection.list_indexes():
+        if index["name"] == name:
+            existing = index
+
+    if seconds <= 0:
+        if existing is not None:
+            await collection.drop_index(name)
+        return
+    if existing is None:
+        await collection.create_index([(field, ASCENDING)], name=name, expireAfterSeconds=seconds)
+    elif existing.get("expireAfterSeconds") != seconds:
+        # An existing TTL index can only be changed in place with collMod
+        await collection.database.command(
+            "collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds}
+        )
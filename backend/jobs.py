@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class RoadmapJobQueue:
+    """MongoDB-backed job queue drained by a bounded pool of asyncio workers.
+
+    Jobs are claimed with an atomic find_one_and_update and hold a lease while
+    they run. A job whose lease expires (its worker crashed or was restarted)
+    becomes claimable again, so any worker in any process picks it back up.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[dict], Awaitable[dict]],
+        workers: int = 4,
+        lease_seconds: int = 300,
+        max_attempts: int = 3,
+        poll_interval: float = 5.0,
+    ):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+
+    async def start(self):
+        await self._fail_exhausted_jobs()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, form_id: str) -> dict:
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "form_id": form_id,
+            "status": JOB_QUEUED,
+            "attempts": 0,
+            "roadmap_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "lease_expires_at": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": job_id}, {"_id": 0, "lease_expires_at": 0})
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JOB_QUEUED},
+                    {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}},
+                ],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _finish(self, job: dict, fields: dict):
+        fields["updated_at"] = datetime.utcnow()
+        fields["lease_expires_at"] = None
+        await self.collection.update_one({"id": job["id"]}, {"$set": fields})
+
+    async def _fail_exhausted_jobs(self):
+        # Jobs that crashed their worker on every attempt would otherwise stay "running" forever
+        await self.collection.update_many(
+            {
+                "status": JOB_RUNNING,
+                "lease_expires_at": {"$lt": datetime.utcnow()},
+                "attempts": {"$gte": self.max_attempts},
+            },
+            {"$set": {
+                "status": JOB_FAILED,
+                "error": "Job did not finish after repeated attempts",
+                "lease_expires_at": None,
+            }},
+        )
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logging.error(f"Failed to claim roadmap job: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = await self.handler(job)
+                await self._finish(job, {"status": JOB_COMPLETED, **result})
+            except asyncio.CancelledError:
+                # Leave the lease in place; the job is retried once it expires
+                raise
+            except Exception as e:
+                logging.error(f"Roadmap job {job['id']} failed: {str(e)}")
+                try:
+                    await self._finish(job, {"status": JOB_FAILED, "error": str(e)})
+                except Exception as e:
+                    logging.error(f"Failed to record roadmap job failure: {str(e)}")
@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Set by send_hedged for its primary attempt: resolved with the time that attempt got a slot
+_primary_slot_acquired: contextvars.ContextVar = contextvars.ContextVar("primary_slot_acquired", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the breaker is open"""
+
+
+class CircuitBreaker:
+    """Trips after a run of failed or slow calls and stays open for a cool-down.
+
+    Once the cool-down has passed a single probe call is let through; its
+    outcome decides whether the breaker closes again or re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = 5, slow_call_seconds: float = 30.0, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                return False
+            self.state = BREAKER_HALF_OPEN
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self, latency: float):
+        if latency >= self.slow_call_seconds:
+            # A slow answer is still an answer, but it counts towards tripping
+            self.record_failure()
+            return
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.state = BREAKER_CLOSED
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                self.trips += 1
+            self.state = BREAKER_OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        # The caller went away; the call tells us nothing about the provider
+        self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "failure_threshold": self.failure_threshold,
+            "slow_call_seconds": self.slow_call_seconds,
+            "cooldown_seconds": self.cooldown_seconds,
+        }
+
+
+class LlmGateway:
+    """Process-wide gate in front of the LLM provider.
+
+    Caps concurrent upstream calls with a semaphore, bounds both the wait for
+    a slot and the call itself, and consults the circuit breaker first so that
+    callers fail fast (and serve their fallback) during provider incidents.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        timeout_seconds: float = 45.0,
+        queue_timeout_seconds: float = 10.0,
+        breaker: CircuitBreaker = None,
+        hedge_percentile: float = 90.0,
+        hedge_delay_seconds: float = 20.0,
+        hedge_min_samples: int = 20,
+        hedge_max_rate: float = 0.1,
+        latency_window: int = 500,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self._wait_started = {}
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0, "queue_timeouts": 0, "rejected": 0}
+        # Hedging: a percentile of 0 turns it off; until enough latencies have been
+        # observed the fixed hedge_delay_seconds is used instead
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.hedge_min_samples = hedge_min_samples
+        # At most this share of requests may hedge, so hedges never double the load
+        self.hedge_max_rate = hedge_max_rate
+        self._latencies = deque(maxlen=latency_window)
+        self.hedge_stats = {
+            "requests": 0, "hedges": 0, "hedges_skipped": 0, "primary_wins": 0, "hedge_wins": 0, "budget_exhausted": 0
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self.breaker.allow_request():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        self.waiting += 1
+        ticket = object()
+        self._wait_started[ticket] = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.stats["queue_timeouts"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+        finally:
+            self.waiting -= 1
+            del self._wait_started[ticket]
+
+        self.in_flight += 1
+        self.stats["calls"] += 1
+        started = time.monotonic()
+        slot_acquired = _primary_slot_acquired.get()
+        if slot_acquired is not None and not slot_acquired.done():
+            slot_acquired.set_result(asyncio.get_running_loop().time())
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+        else:
+            latency = time.monotonic() - started
+            self._latencies.append(latency)
+            self.breaker.record_success(latency)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def send(self, chat, message) -> str:
+        async with self.slot():
+            return await asyncio.wait_for(chat.send_message(message), self.timeout_seconds)
+
+    def queue_wait(self) -> float:
+        """How long the longest-waiting caller has been queued for a slot so far"""
+        if not self._wait_started:
+            return 0.0
+        return time.monotonic() - min(self._wait_started.values())
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(round(percentile / 100 * (len(latencies) - 1)))]
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile <= 0:
+            return None
+        if len(self._latencies) < self.hedge_min_samples:
+            return self.hedge_delay_seconds
+        return self.latency_percentile(self.hedge_percentile)
+
+    def may_hedge(self) -> bool:
+        # A hedge that has to queue for a slot only lengthens the queue admission control sheds on
+        if self.waiting > 0 or self.in_flight >= self.max_concurrency or self.breaker.state != BREAKER_CLOSED:
+            return False
+        return self.hedge_stats["hedges"] < self.hedge_max_rate * self.hedge_stats["requests"]
+
+    async def send_hedged(self, attempt, budget_seconds: float):
+        """Run ``attempt()`` within a deadline budget, hedging slow or failed calls.
+
+        ``attempt`` must return a coroutine that produces a *valid* result or
+        raises. If the primary has not succeeded within the hedge delay of
+        getting a gateway slot (or fails before that), one more attempt is
+        launched and whichever succeeds first wins; the other is cancelled.
+        The delay is a percentile of call time, so time spent queueing for a
+        slot does not count towards it. No hedge is launched while callers are
+        queueing or once ``hedge_max_rate`` of requests have hedged. Raises
+        asyncio.TimeoutError once the budget is spent, or the last attempt's
+        error when every attempt failed.
+        """
+        self.hedge_stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget_seconds
+        delay = self.hedge_delay()
+        hedged = delay is None
+        hedge_at = None
+
+        slot_acquired = loop.create_future()
+        token = _primary_slot_acquired.set(slot_acquired)
+        try:
+            primary = asyncio.ensure_future(attempt())
+        finally:
+            _primary_slot_acquired.reset(token)
+        pending = {primary}
+        last_error = None
+        try:
+            while True:
+                now = loop.time()
+                if now >= deadline:
+                    self.hedge_stats["budget_exhausted"] += 1
+                    raise asyncio.TimeoutError("LLM deadline budget exhausted")
+
+                watched = set(pending)
+                if not hedged and hedge_at is None:
+                    if slot_acquired.done():
+                        hedge_at = slot_acquired.result() + delay
+                    else:
+                        watched.add(slot_acquired)
+                wake_at = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(watched, timeout=max(0.0, wake_at - now), return_when=asyncio.FIRST_COMPLETED)
+                for task in done - {slot_acquired}:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        self.hedge_stats["primary_wins" if task is primary else "hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+
+                if not hedged and (not pending or (hedge_at is not None and loop.time() >= hedge_at)):
+                    hedged = True
+                    if isinstance(last_error, CircuitOpenError):
+                        # Refused by the breaker; another attempt would be refused as well
+                        pass
+                    elif self.may_hedge():
+                        self.hedge_stats["hedges"] += 1
+                        pending.add(asyncio.ensure_future(attempt()))
+                    else:
+                        self.hedge_stats["hedges_skipped"] += 1
+                # A refused hedge leaves the primary running, which may be the breaker's probe call
+                if not pending:
+                    raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if not slot_acquired.done():
+                slot_acquired.cancel()
+
+    def snapshot(self) -> dict:
+        requests = self.hedge_stats["requests"]
+        hedges = self.hedge_stats["hedges"]
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "queue_wait_seconds": round(self.queue_wait(), 3),
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            "breaker": self.breaker.snapshot(),
+            "latency_seconds": {
+                f"p{percentile}": self.latency_percentile(percentile) for percentile in (50, 90, 99)
+            },
+            "hedging": {
+                **self.hedge_stats,
+                "hedge_rate": round(hedges / requests, 4) if requests else 0.0,
+                "hedge_win_rate": round(self.hedge_stats["hedge_wins"] / hedges, 4) if hedges else 0.0,
+                "hedge_percentile": self.hedge_percentile,
+                "hedge_max_rate": self.hedge_max_rate,
+                "current_hedge_delay": self.hedge_delay(),
+            },
+        }
@@ -0,0 +1,189 @@
+import re
+from typing import NamedTuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: exact counts for the gpt-4o tokenizer
+    tiktoken = None
+
+# JSON shapes of each roadmap section, one line each. The compact prompt describes
+# the whole document with these instead of a worked example.
+SECTION_SCHEMAS = {
+    "roadmap": '"roadmap": [{"phase": "Months X-Y: Title", "focus_areas": ["..."], "learning_resources": [{"title": "...", "type": "course|video|article", "url": "https://..."}], "projects": [{"title": "...", "description": "...", "difficulty": "Beginner|Intermediate|Advanced"}]}]',
+    "job_roles": '"job_roles": ["Role", "..."]',
+    "example_companies": '"example_companies": ["Company", "..."]',
+    "interview_prep": '"interview_prep": {"important_topics": ["..."], "resources": [{"title": "...", "type": "course|video|article", "url": "https://..."}]}',
+}
+SECTION_SCHEMAS["phases"] = SECTION_SCHEMAS["roadmap"].replace('"roadmap"', '"phases"', 1)
+ROADMAP_SCHEMA = "{" + ", ".join(
+    SECTION_SCHEMAS[section] for section in ("roadmap", "job_roles", "example_companies", "interview_prep")
+) + "}"
+
+# Output budget: a phase with three resources and a project runs to roughly 250-300
+# tokens, the other sections to about 400; both are padded so a budget only ever
+# cuts off a runaway reply
+BASE_OUTPUT_TOKENS = 600
+PHASE_OUTPUT_TOKENS = 400
+
+# v1: the original prompt, a worked JSON example plus a long guidelines block
+ROADMAP_PROMPT_V1 = """
+Create a comprehensive, actionable career roadmap for a student with the following profile:
+{profile}
+
+Generate a detailed 12-18 month roadmap with 5-6 phases. Each phase should be 2-3 months long with clear, actionable goals.
+
+IMPORTANT GUIDELINES:
+1. Use REAL, working URLs from these trusted sources:
+   - Coursera.org, Udemy.com, edX.org for courses
+   - YouTube.com for video tutorials
+   - GitHub.com for code examples
+   - FreeCodeCamp.org for free programming content
+   - Kaggle.com for data science projects
+   - Medium.com for articles
+   - Pluralsight.com for tech training
+   - AWS, Google Cloud, Azure official documentation
+
+2. Focus areas should be specific, measurable skills
+3. Projects should build progressively in complexity
+4. Include both FREE and PAID resources clearly labeled
+5. Make learning paths realistic and time-bound
+
+Respond ONLY with valid JSON in this exact structure:
+{{
+  "roadmap": [
+    {{
+      "phase": "Months 1-2: Foundation Building",
+      "focus_areas": ["Specific skill with measurable outcome", "Another concrete skill", "Third focused area"],
+      "learning_resources": [
+        {{
+          "title": "Specific Course/Resource Name",
+          "type": "course",
+          "url": "https://coursera.org/learn/example-course"
+        }},
+        {{
+          "title": "YouTube Tutorial Series Name", 
+          "type": "video",
+          "url": "https://youtube.com/watch?v=example"
+        }},
+        {{
+          "title": "Free Resource Title",
+          "type": "article", 
+          "url": "https://freecodecamp.org/news/example"
+        }}
+      ],
+      "projects": [
+        {{
+          "title": "Descriptive Project Name",
+          "description": "Detailed description with specific technologies, expected outcomes, and key learning objectives. Mention estimated time to complete.",
+          "difficulty": "Beginner"
+        }}
+      ]
+    }},
+    {{
+      "phase": "Months 3-4: Skill Development",
+      "focus_areas": ["Next level skill 1", "Intermediate skill 2", "Practical application skill 3"],
+      "learning_resources": [
+        {{
+          "title": "Advanced Course Name",
+          "type": "course",
+          "url": "https://udemy.com/course/example"
+        }}
+      ],
+      "projects": [
+        {{
+          "title": "Intermediate Project Name", 
+          "description": "More complex project building on previous knowledge. Include specific features to implement and technologies to use.",
+          "difficulty": "Intermediate"
+        }}
+      ]
+    }}
+  ],
+  "job_roles": ["Entry Level Position", "Mid-Level Role", "Senior Position"],
+  "example_companies": ["Major Tech Company", "Growing Startup", "Enterprise Corporation", "Consulting Firm", "Remote-First Company"],
+  "interview_prep": {{
+    "important_topics": ["Technical Concept 1", "Practical Skill 2", "Industry Knowledge 3", "Soft Skill 4", "Problem Solving 5"],
+    "resources": [
+      {{
+        "title": "Interview Preparation Platform",
+        "type": "course",
+        "url": "https://leetcode.com"
+      }},
+      {{
+        "title": "System Design Resource",
+        "type": "article",
+        "url": "https://github.com/donnemartin/system-design-primer"
+      }},
+      {{
+        "title": "Behavioral Interview Guide",
+        "type": "article",
+        "url": "https://medium.com/@example-behavioral-prep"
+      }}
+    ]
+  }}
+}}
+
+Create 5-6 progressive phases that build upon each other. Ensure all URLs are real and accessible. Focus on {career_interest} career path with {learning_style} learning approach.
+"""
+
+# v2: the same rules condensed, with a one-line schema and exactly `phases` phases
+ROADMAP_PROMPT_V2 = """
+Create a {months}-month career roadmap in exactly {phases} phases of 2 months each for this student:
+{profile}
+
+Rules: focus areas are specific, measurable skills; projects build on each other and grow in difficulty; every resource is a real, working URL from a trusted source (Coursera, Udemy, edX, YouTube, GitHub, freeCodeCamp, Kaggle, official docs) and its title says whether it is free or paid; project descriptions are 1-2 sentences and name the technologies and an estimated time. Tailor the plan to a {learning_style} learner aiming for {career_interest}. Give 3 job roles, 5 example companies, 5 interview topics and 3 interview resources.
+
+Respond ONLY with JSON: {schema}
+"""
+
+PROMPT_TEMPLATES = {"v1": ROADMAP_PROMPT_V1, "v2": ROADMAP_PROMPT_V2}
+DEFAULT_PROMPT_VERSION = "v2"
+
+
+class CompiledPrompt(NamedTuple):
+    text: str
+    version: str
+    input_tokens: int
+    max_output_tokens: int
+
+
+def count_tokens(text: str) -> int:
+    """Token count under the gpt-4o tokenizer, or a close estimate without tiktoken"""
+    if tiktoken is not None:
+        return len(_encoding().encode(text))
+    # Words and punctuation marks are each about one token; long words split into more
+    return sum(1 + len(piece) // 8 for piece in re.findall(r"\w+|[^\w\s]", text))
+
+
+def tokenizer_name() -> str:
+    return "tiktoken:o200k_base" if tiktoken is not None else "approximate"
+
+
+_ENCODING = None
+
+
+def _encoding():
+    global _ENCODING
+    if _ENCODING is None:
+        _ENCODING = tiktoken.get_encoding("o200k_base")
+    return _ENCODING
+
+
+def max_output_tokens(phases: int) -> int:
+    return BASE_OUTPUT_TOKENS + PHASE_OUTPUT_TOKENS * phases
+
+
+def compile_roadmap_prompt(profile: str, career_interest: str, learning_style: str, phases: int = 6, version: str = DEFAULT_PROMPT_VERSION) -> CompiledPrompt:
+    """Render a roadmap prompt version for a formatted student profile, with its token budget"""
+    if version not in PROMPT_TEMPLATES:
+        raise ValueError(f"Unknown roadmap prompt version {version!r}")
+    text = PROMPT_TEMPLATES[version].format(
+        profile=profile,
+        career_interest=career_interest,
+        learning_style=learning_style,
+        phases=phases,
+        months=phases * 2,
+        schema=ROADMAP_SCHEMA,
+    )
+    # v1 asks for "5-6 phases" whatever was requested, so it gets the budget for 6
+    budget_phases = max(phases, 6) if version == "v1" else phases
+    return CompiledPrompt(text, version, count_tokens(text), max_output_tokens(budget_phases))
@@ -0,0 +1,226 @@
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import List
+
+from pymongo import UpdateOne
+
+# Value of a roadmap document's "storage" field when its resources and projects are references
+STORAGE_NORMALIZED = "normalized"
+
+# Kinds of interned objects; part of the content hash so the two never collide
+KIND_RESOURCE = "resource"
+KIND_PROJECT = "project"
+
+
+def content_id(kind: str, value: dict) -> str:
+    """Content-hash id: equal objects of the same kind always intern to the same document"""
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{kind}:{payload}".encode("utf-8")).hexdigest()
+
+
+def _reference_lists(doc: dict):
+    """Yield (kind, list) for every list of interned objects in a roadmap document"""
+    for phase in doc.get("roadmap") or []:
+        if "learning_resources" in phase:
+            yield KIND_RESOURCE, phase["learning_resources"]
+        if "projects" in phase:
+            yield KIND_PROJECT, phase["projects"]
+    interview_prep = doc.get("interview_prep")
+    if interview_prep and "resources" in interview_prep:
+        yield KIND_RESOURCE, interview_prep["resources"]
+
+
+class ResourceStore:
+    """Interns learning resources and projects into one shared collection.
+
+    Normalized roadmap documents keep content-hash ids in place of each
+    resource and project; ``expand`` swaps them back with a single ``$in``
+    lookup for whatever the bounded in-process cache does not already hold.
+    Objects are never updated in place, so cached entries cannot go stale.
+    """
+
+    def __init__(self, collection, cache_entries: int = 50000):
+        self.collection = collection
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self.stats = {"interned": 0, "written": 0, "expanded": 0, "cache_hits": 0, "cache_misses": 0, "lookups": 0}
+
+    def _remember(self, object_id: str, value: dict):
+        if self.cache_entries <= 0:
+            return
+        self._cache[object_id] = value
+        self._cache.move_to_end(object_id)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    async def intern(self, docs: List[dict]) -> List[dict]:
+        """Normalized copies of roadmap documents; new objects are upserted in one bulk write"""
+        normalized = []
+        new_objects = {}
+        for doc in docs:
+            doc = copy.deepcopy(doc)
+            for kind, values in _reference_lists(doc):
+                for index, value in enumerate(values):
+                    object_id = content_id(kind, value)
+                    if object_id not in self._cache:
+                        new_objects[object_id] = (kind, value)
+                    values[index] = object_id
+                    self.stats["interned"] += 1
+            # The pre-serialized body would duplicate everything interned above
+            doc.pop("blob", None)
+            doc.pop("blob_encoding", None)
+            doc["storage"] = STORAGE_NORMALIZED
+            normalized.append(doc)
+
+        if new_objects:
+            await self.collection.bulk_write(
+                [
+                    UpdateOne({"_id": object_id}, {"$setOnInsert": {"kind": kind, "value": value}}, upsert=True)
+                    for object_id, (kind, value) in new_objects.items()
+                ],
+                ordered=False,
+            )
+            self.stats["written"] += len(new_objects)
+            for object_id, (_, value) in new_objects.items():
+                self._remember(object_id, value)
+        return normalized
+
+    async def expand(self, doc: dict) -> dict:
+        """Rebuild a normalized roadmap document with its objects inlined again"""
+        doc.pop("storage", None)
+        doc.pop("blob_encoding", None)
+        doc.pop("etag", None)
+        references = [(values, index, object_id) for _, values in _reference_lists(doc) for index, object_id in enumerate(values)]
+        found = {}
+        missing = set()
+        for _, _, object_id in references:
+            value = self._cache.get(object_id)
+            if value is None:
+                missing.add(object_id)
+            else:
+                self._cache.move_to_end(object_id)
+                found[object_id] = value
+        self.stats["cache_hits"] += len(references) - len(missing)
+        self.stats["cache_misses"] += len(missing)
+
+        if missing:
+            self.stats["lookups"] += 1
+            async for stored in self.collection.find({"_id": {"$in": list(missing)}}):
+                found[stored["_id"]] = stored["value"]
+                self._remember(stored["_id"], stored["value"])
+
+        for values, index, object_id in references:
+            if object_id not in found:
+                raise LookupError(f"Interned object {object_id} is missing")
+            # Every document gets its own copies, as with embedded storage
+            values[index] = copy.deepcopy(found[object_id])
+        self.stats["expanded"] += 1
+        return doc
+
+    def snapshot(self) -> dict:
+        references = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return {
+            **self.stats,
+            "cache_entries": len(self._cache),
+            "max_cache_entries": self.cache_entries,
+            "cache_hit_ratio": round(self.stats["cache_hits"] / references, 4) if references else 0.0,
+        }
+
+
+def benchmark(roadmaps: int = 20000, seed: int = 7) -> dict:
+    """Storage saved and read overhead of normalized storage on a synthetic corpus"""
+    import asyncio
+    import random
+
+    import bson
+
+    rng = random.Random(seed)
+    # A realistic skew: a few hundred popular resources and stock projects cover most roadmaps
+    resources = [
+        {"title": f"Resource {i}", "type": rng.choice(["course", "video", "article"]), "url": f"https://example.com/r/{i}"}
+        for i in range(400)
+    ]
+    projects = [
+        {"title": f"Project {i}", "description": "Build a small application that applies this phase's skills. " * 3,
+         "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"])}
+        for i in range(300)
+    ]
+
+    def pick(pool, count):
+        # Zipf-like popularity: low indices are far more common
+        return [pool[min(int(rng.paretovariate(1.2)) - 1, len(pool) - 1)] for _ in range(count)]
+
+    corpus = [
+        {
+            "id": str(i),
+            "roadmap": [
+                {"phase": f"Months {2 * p + 1}-{2 * p + 2}", "focus_areas": ["a", "b", "c"],
+                 "learning_resources": pick(resources, 3), "projects": pick(projects, 1)}
+                for p in range(6)
+            ],
+            "job_roles": ["Analyst", "Engineer", "Lead"],
+            "example_companies": ["A", "B", "C", "D", "E"],
+            "interview_prep": {"important_topics": ["x", "y", "z"], "resources": pick(resources, 3)},
+        }
+        for i in range(roadmaps)
+    ]
+
+    class MemoryCollection:
+        def __init__(self):
+            self.docs = {}
+
+        async def bulk_write(self, requests, ordered=True):
+            for request in requests:
+                self.docs.setdefault(request._filter["_id"], {"_id": request._filter["_id"], **request._doc["$setOnInsert"]})
+
+        def find(self, query):
+            ids = query["_id"]["$in"]
+
+            async def cursor():
+                for object_id in ids:
+                    yield self.docs[object_id]
+            return cursor()
+
+    async def run():
+        collection = MemoryCollection()
+        store = ResourceStore(collection)
+        normalized = await store.intern(corpus)
+
+        embedded_bytes = sum(len(bson.encode(doc)) for doc in corpus)
+        normalized_bytes = sum(len(bson.encode(doc)) for doc in normalized)
+        shared_bytes = sum(len(bson.encode(doc)) for doc in collection.docs.values())
+
+        sample = [copy.deepcopy(doc) for doc in normalized[:1000]]
+        started = time.perf_counter()
+        for doc in sample:
+            await store.expand(doc)
+        warm_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+        cold = ResourceStore(collection, cache_entries=0)
+        sample = [copy.deepcopy(doc) for doc in normalized[:1000]]
+        started = time.perf_counter()
+        for doc in sample:
+            await cold.expand(doc)
+        cold_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+        return {
+            "roadmaps": roadmaps,
+            "shared_objects": len(collection.docs),
+            "embedded_mb": round(embedded_bytes / 1024 / 1024, 2),
+            "normalized_mb": round((normalized_bytes + shared_bytes) / 1024 / 1024, 2),
+            "saved_ratio": round(1 - (normalized_bytes + shared_bytes) / embedded_bytes, 3),
+            "expand_warm_cache_us": round(warm_us, 1),
+            # Excludes the $in round trip itself, one per cold read
+            "expand_cold_cache_us": round(cold_us, 1),
+        }
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(json.dumps(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000), indent=2))
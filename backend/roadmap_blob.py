@@ -0,0 +1,40 @@
+import hashlib
+import zlib
+from typing import Tuple
+
+import orjson
+
+BLOB_IDENTITY = "identity"
+# zlib-wrapped deflate is exactly what HTTP calls Content-Encoding: deflate
+BLOB_DEFLATE = "deflate"
+
+
+def encode_roadmap_blob(document: dict, compress_min_bytes: int = 2048) -> Tuple[bytes, str, str]:
+    """Serialize a roadmap document once, at write time, into its response body.
+
+    Returns the stored blob, its encoding and a strong ETag over the
+    uncompressed body.
+    """
+    body = orjson.dumps(document)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if 0 < compress_min_bytes <= len(body):
+        return zlib.compress(body, 6), BLOB_DEFLATE, etag
+    return body, BLOB_IDENTITY, etag
+
+
+def decode_roadmap_blob(blob: bytes, encoding: str) -> bytes:
+    if encoding == BLOB_DEFLATE:
+        return zlib.decompress(blob)
+    return bytes(blob)
+
+
+def blob_etag(blob: bytes, encoding: str) -> str:
+    return f'"{hashlib.sha256(decode_roadmap_blob(blob, encoding)).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
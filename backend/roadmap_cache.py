@@ -0,0 +1,220 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Profile fields that decide the generated roadmap; id and timestamp are per-request noise
+PROFILE_FIELDS = ("degree", "year", "skills", "career_interest", "learning_style")
+
+
+def _normalize_text(value: str) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def canonical_profile(form_data) -> dict:
+    """Reduce a career form to the fields that matter, in a stable shape"""
+    profile = {field: _normalize_text(getattr(form_data, field)) for field in PROFILE_FIELDS}
+    skills = {skill.strip() for skill in profile["skills"].split(",")}
+    profile["skills"] = sorted(skill for skill in skills if skill)
+    return profile
+
+
+def canonical_profile_key(form_data, variant: str = "") -> str:
+    """Hash of the canonical profile; ``variant`` keeps roadmaps from different prompt setups apart"""
+    profile = canonical_profile(form_data)
+    if variant:
+        profile["variant"] = variant
+    payload = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RoadmapCache:
+    """Two-tier roadmap cache: a bounded in-process LRU with TTL in front of a
+    MongoDB collection shared by every worker."""
+
+    def __init__(self, collection=None, max_entries: int = 1024, ttl_seconds: int = 86400):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "mongo_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, roadmap_data = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return roadmap_data
+
+    def _set_local(self, key: str, roadmap_data: dict, ttl_seconds: float):
+        if self.max_entries <= 0 or ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl_seconds, roadmap_data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[dict]:
+        roadmap_data = self._get_local(key)
+        if roadmap_data is not None:
+            self.stats["memory_hits"] += 1
+            return copy.deepcopy(roadmap_data)
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"key": key}, {"_id": 0})
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"Roadmap cache lookup failed: {str(e)}")
+                doc = None
+            if doc and doc["expires_at"] > datetime.utcnow():
+                self.stats["mongo_hits"] += 1
+                # Promote into the local tier for the rest of the entry's lifetime
+                remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                self._set_local(key, doc["roadmap"], remaining)
+                return copy.deepcopy(doc["roadmap"])
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, roadmap_data: dict):
+        roadmap_data = copy.deepcopy(roadmap_data)
+        self._set_local(key, roadmap_data, self.ttl_seconds)
+        self.stats["writes"] += 1
+        if self.collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {"key": key},
+                {"$set": {
+                    "key": key,
+                    "roadmap": roadmap_data,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"Roadmap cache write failed: {str(e)}")
+
+    async def ensure_indexes(self):
+        if self.collection is None:
+            return
+        await self.collection.create_index("key", unique=True)
+        # Let MongoDB reap expired entries on its own
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def snapshot(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one shared generation.
+
+    The first caller starts the work as a task; later callers with the same key
+    await that task instead of starting their own. The task is shielded, so a
+    caller that disconnects does not cancel the work for everyone else.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"leaders": 0, "waiters": 0, "max_waiters": 0}
+
+    async def do(self, key: str, fn):
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["leaders"] += 1
+        else:
+            flight[1] += 1
+            self.stats["waiters"] += 1
+            self.stats["max_waiters"] = max(self.stats["max_waiters"], flight[1])
+        # Every caller gets its own copy of the shared result
+        return copy.deepcopy(await asyncio.shield(flight[0]))
+
+    def joinable(self, key: str) -> bool:
+        return key in self._inflight
+
+    def snapshot(self) -> dict:
+        calls = self.stats["leaders"] + self.stats["waiters"]
+        return {
+            **self.stats,
+            "in_flight": len(self._inflight),
+            "waiting": sum(waiters for _, waiters in self._inflight.values()),
+            "coalescing_ratio": round(self.stats["waiters"] / calls, 4) if calls else 0.0,
+        }
+
+
+class HotRoadmapCache:
+    """LRU of recently read or written roadmap bodies, bounded by total bytes.
+
+    Entries are the stored blob, its encoding and its ETag, keyed by roadmap
+    id, so a hit can answer a GET (or a 304) without touching MongoDB.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    def get(self, roadmap_id: str) -> Optional[dict]:
+        entry = self._entries.get(roadmap_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(roadmap_id)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, roadmap_id: str, blob: bytes, blob_encoding: str, etag: str):
+        blob = bytes(blob)
+        if len(blob) > self.max_bytes:
+            return
+        previous = self._entries.pop(roadmap_id, None)
+        if previous is not None:
+            self.size_bytes -= len(previous["blob"])
+        self._entries[roadmap_id] = {"blob": blob, "blob_encoding": blob_encoding, "etag": etag}
+        self.size_bytes += len(blob)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted["blob"])
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,95 @@
+import json
+import re
+from typing import Tuple
+
+FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+
+# How many cut points to try, newest first, when repairing a truncated document
+MAX_REPAIR_ATTEMPTS = 200
+
+
+def extract_json_object(text: str) -> Tuple[dict, str]:
+    """Parse the JSON object in an LLM reply, tolerating common damage.
+
+    Returns the object and the path that recovered it: ``direct`` when the
+    reply was clean JSON, ``fenced`` when it sat in a markdown code fence,
+    ``extracted`` when surrounding prose had to be cut away and
+    ``truncation_repaired`` when the reply stopped mid-document and was closed
+    off after its last complete value. Raises ValueError when nothing usable
+    is found.
+    """
+    try:
+        return _as_object(json.loads(text)), "direct"
+    except (ValueError, TypeError):
+        pass
+
+    fenced = FENCE_RE.search(text)
+    if fenced:
+        try:
+            return _as_object(json.loads(fenced.group(1))), "fenced"
+        except ValueError:
+            pass
+
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in LLM response")
+    end = text.rfind("}")
+    if end > start:
+        try:
+            return _as_object(json.loads(text[start:end + 1])), "extracted"
+        except ValueError:
+            pass
+
+    repaired = repair_truncated_json(text[start:])
+    if repaired is None:
+        raise ValueError("LLM response is not recoverable JSON")
+    return repaired, "truncation_repaired"
+
+
+def repair_truncated_json(text: str):
+    """Close a truncated JSON object after its last complete value.
+
+    Records every point where the document could be cut cleanly (before a
+    comma, or after a closing bracket) together with the brackets still open
+    there, then tries those cuts from the end backwards.
+    """
+    stack = []
+    cuts = []
+    in_string = False
+    escape = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, "".join(stack)))
+            if not stack:
+                break
+        elif c == ",":
+            cuts.append((i, "".join(stack)))
+
+    for cut, open_brackets in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        closing = "".join("}" if bracket == "{" else "]" for bracket in reversed(open_brackets))
+        try:
+            return _as_object(json.loads(text[:cut] + closing))
+        except ValueError:
+            continue
+    return None
+
+
+def _as_object(value) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError("LLM response JSON is not an object")
+    return value
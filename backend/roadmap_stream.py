@@ -0,0 +1,108 @@
+import json
+from typing import Any, List, Tuple
+
+WHITESPACE = " \t\r\n"
+
+
+class RoadmapStreamParser:
+    """Incremental scanner over the LLM's JSON output.
+
+    Text is fed in arbitrary chunks. Every roadmap phase is reported as soon as
+    its object closes, and every other top-level section as soon as its value
+    closes, so callers can forward content before the document is finished.
+    Anything before the first ``{`` (e.g. a ```json fence) or after the
+    closing ``}`` is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.document = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect = None  # "key" or "value" while scanning the top-level object
+        self._key = None
+        self._value_start = None
+        self._phase_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        events = []
+        text = self.text
+        while self._pos < len(text) and not self.complete:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._close_string(i, events)
+                continue
+
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._expect = "key"
+                continue
+
+            if self._depth == 1:
+                if c in WHITESPACE:
+                    continue
+                if c == ":":
+                    self._expect = "value"
+                    continue
+                if c in ",}":
+                    self._finish_scalar(i, events)
+                    self._expect = "key"
+                    if c == "}":
+                        self._depth = 0
+                        self.complete = True
+                    continue
+                if self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "{" and self._depth == 3 and self._key == "roadmap":
+                    self._phase_start = i
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._phase_start is not None:
+                    phase = json.loads(text[self._phase_start:i + 1])
+                    self._phase_start = None
+                    events.append(("phase", phase))
+                elif self._depth == 1:
+                    self._finish_value(i, events)
+        return events
+
+    def _close_string(self, end: int, events: list):
+        if self._depth != 1:
+            return
+        raw = self.text[self._string_start:end + 1]
+        if self._expect == "key":
+            self._key = json.loads(raw)
+        elif self._value_start == self._string_start:
+            self._finish_value(end, events)
+
+    def _finish_scalar(self, end: int, events: list):
+        # Numbers, booleans and null have no closing delimiter of their own
+        if self._value_start is not None:
+            self._finish_value(end - 1, events)
+
+    def _finish_value(self, end: int, events: list):
+        value = json.loads(self.text[self._value_start:end + 1].strip())
+        self.document[self._key] = value
+        events.append((self._key, value))
+        self._value_start = None
+        self._key = None
@@ -1,27 +1,66 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
+import math
+import resource
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
+import base64
+import hashlib
+import secrets
+from collections import Counter
 from datetime import datetime
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import json
+from database import LazyDatabase
+from roadmap_cache import PROFILE_FIELDS, HotRoadmapCache, RoadmapCache, SingleFlight, canonical_profile, canonical_profile_key
+from similarity import SimilarRoadmapIndex
+from write_behind import WriteBehindBuffer
+from metrics import SIZE_BUCKETS, MetricsRegistry
+from roadmap_stream import RoadmapStreamParser
+from jobs import RoadmapJobQueue
+from indexes import apply_retention, ensure_indexes, index_report
+from llm_gateway import CircuitBreaker, CircuitOpenError, LlmGateway
+from admission import ADMISSION_DEGRADE, ADMISSION_REJECT, AdmissionController, Overloaded, TokenBucketLimiter
+from roadmap_parsing import extract_json_object
+from prompts import SECTION_SCHEMAS, CompiledPrompt, compile_roadmap_prompt, max_output_tokens
+from analytics import AnalyticsRollups
+from export import EXPORT_PARQUET, PARQUET_MEDIA_TYPE, export_batches, export_query, ndjson_chunks, parquet_available, parquet_chunks
+from fallback import TOKEN_RE, FallbackEngine
+from resource_store import STORAGE_NORMALIZED, ResourceStore
+from roadmap_blob import BLOB_DEFLATE, blob_etag, decode_roadmap_blob, encode_roadmap_blob, etag_matches
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, opened by the lifespan; collections can be referenced before that
+db = LazyDatabase()
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '4'))
+
+# Warn when importing this module takes longer than this
+IMPORT_BUDGET_SECONDS = float(os.environ.get('IMPORT_BUDGET_SECONDS', '2'))
+readiness = {"ready": False, "error": None, "ready_seconds": None}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve liveness immediately; MongoDB and the background workers come up behind /api/health/ready
+    startup = asyncio.create_task(start_resources())
+    yield
+    startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    await shutdown_db_client()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -29,6 +68,154 @@ api_router = APIRouter(prefix="/api")
 # LLM Configuration
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
 
+# The LLM SDK is by far the slowest import, so it is loaded on first use
+LlmChat = None
+UserMessage = None
+
+def load_llm_sdk():
+    global LlmChat, UserMessage
+    if LlmChat is None or UserMessage is None:
+        from emergentintegrations.llm import chat as llm_sdk
+        LlmChat = LlmChat or llm_sdk.LlmChat
+        UserMessage = UserMessage or llm_sdk.UserMessage
+
+# Shared gate for every upstream LLM call: concurrency cap, deadlines and circuit breaker
+llm_gateway = LlmGateway(
+    max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '16')),
+    timeout_seconds=float(os.environ.get('LLM_TIMEOUT_SECONDS', '45')),
+    queue_timeout_seconds=float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', '10')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('LLM_BREAKER_FAILURE_THRESHOLD', '5')),
+        slow_call_seconds=float(os.environ.get('LLM_BREAKER_SLOW_CALL_SECONDS', '30')),
+        cooldown_seconds=float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30')),
+    ),
+    hedge_percentile=float(os.environ.get('LLM_HEDGE_PERCENTILE', '90')),
+    hedge_delay_seconds=float(os.environ.get('LLM_HEDGE_DELAY_SECONDS', '20')),
+    hedge_max_rate=float(os.environ.get('LLM_HEDGE_MAX_RATE', '0.1')),
+)
+# Proxies in front of the API that append to X-Forwarded-For; 0 keys rate limits on the peer address
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '1'))
+# Load shedding for career form submissions (single, streamed and batch): a per-client rate limit (0 disables) and
+# admission to the LLM queue, which either rejects with 429 or serves a degraded fallback
+career_form_limiter = TokenBucketLimiter(
+    rate_per_second=float(os.environ.get('CAREER_FORM_RATE_PER_MINUTE', '30')) / 60,
+    burst=int(os.environ.get('CAREER_FORM_BURST', '10')),
+)
+llm_admission = AdmissionController(
+    llm_gateway,
+    max_waiting=int(os.environ.get('ADMISSION_MAX_LLM_WAITING', '32')),
+    max_queue_wait_seconds=float(os.environ.get('ADMISSION_MAX_QUEUE_WAIT_SECONDS', '5')),
+    mode=os.environ.get('ADMISSION_MODE', ADMISSION_DEGRADE),
+)
+# Degraded roadmaps are regenerated by the background job workers once there is capacity
+ADMISSION_REGENERATE_DEGRADED = os.environ.get('ADMISSION_REGENERATE_DEGRADED', 'true').lower() == 'true'
+
+# Prometheus metrics, served at /metrics
+metrics_registry = MetricsRegistry()
+stage_seconds = metrics_registry.histogram(
+    "career_mentor_stage_seconds", "Time spent in each stage of request handling", ("stage",)
+)
+roadmap_fallbacks = metrics_registry.counter(
+    "career_mentor_roadmap_fallbacks_total", "Fallback roadmaps served instead of LLM output", ("reason",)
+)
+http_request_seconds = metrics_registry.histogram(
+    "career_mentor_http_request_seconds", "HTTP request latency until response headers", ("method", "route", "status")
+)
+http_request_bytes = metrics_registry.histogram(
+    "career_mentor_http_request_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS
+)
+http_response_bytes = metrics_registry.histogram(
+    "career_mentor_http_response_bytes", "HTTP response body size (streamed responses excluded)", ("method", "route"), SIZE_BUCKETS
+)
+metrics_registry.gauge("career_mentor_llm_in_flight", "LLM calls currently running", lambda: llm_gateway.in_flight)
+metrics_registry.gauge("career_mentor_llm_waiting", "LLM calls waiting for a gateway slot", lambda: llm_gateway.waiting)
+
+async def timed(stage: str, awaitable):
+    with stage_seconds.time(stage=stage):
+        return await awaitable
+
+# How each LLM reply was recovered (see extract_json_object) and what section repair did
+roadmap_parse_stats = Counter()
+
+# Share of profiles (0-100) generated with concurrent per-section prompts instead of one prompt
+ROADMAP_FANOUT_PERCENT = int(os.environ.get('ROADMAP_FANOUT_PERCENT', '0'))
+roadmap_generation_stats = Counter()
+
+# Roadmap prompt template version (see prompts.py) and the number of phases it asks for;
+# the output token limit follows from the phase count
+ROADMAP_PROMPT_VERSION = os.environ.get('ROADMAP_PROMPT_VERSION', 'v2')
+ROADMAP_PHASES = int(os.environ.get('ROADMAP_PHASES', '6'))
+# Cached and reused roadmaps are only served to requests made with the same prompt setup
+ROADMAP_VARIANT = f"{ROADMAP_PROMPT_VERSION}:{ROADMAP_PHASES}"
+# Opt-in: ask the provider for JSON-only output where the SDK supports request parameters
+LLM_JSON_MODE = os.environ.get('LLM_JSON_MODE', 'false').lower() == 'true'
+
+# Total time a roadmap request may spend on the LLM, hedges included, before falling back
+ROADMAP_DEADLINE_SECONDS = float(os.environ.get('ROADMAP_DEADLINE_SECONDS', '60'))
+
+# Cohort imports through the batch endpoint
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '1000'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+
+# Roadmaps are stored with their pre-serialized response body; bodies this large are deflated (0 disables)
+ROADMAP_BLOB_COMPRESS_MIN_BYTES = int(os.environ.get('ROADMAP_BLOB_COMPRESS_MIN_BYTES', '2048'))
+
+# "normalized" stores each roadmap's resources and projects once, in a shared collection keyed by content hash
+ROADMAP_STORAGE_MODE = os.environ.get('ROADMAP_STORAGE_MODE', 'embedded').lower()
+resource_store = ResourceStore(
+    collection=db.roadmap_resources,
+    cache_entries=int(os.environ.get('RESOURCE_CACHE_MAX_ENTRIES', '50000')),
+)
+
+# Materialized counts behind GET /api/analytics/summary, flushed as batched $inc upserts
+ANALYTICS_MAX_TOP = 100
+analytics_rollups = AnalyticsRollups(
+    collection=db.analytics_rollups,
+    flush_interval=float(os.environ.get('ANALYTICS_FLUSH_SECONDS', '1')),
+    batch_size=int(os.environ.get('ANALYTICS_BACKFILL_BATCH_SIZE', '1000')),
+)
+
+# Admin token for bulk exports and analytics rebuilds; both are disabled unless it is configured
+EXPORT_ADMIN_TOKEN = os.environ.get('EXPORT_ADMIN_TOKEN', '')
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+# Template roadmaps for every career track and learning style, rendered once at import
+fallback_engine = FallbackEngine.load(ROOT_DIR / 'fallback_templates')
+
+# Recently read or written roadmap bodies, so reloads skip MongoDB entirely
+hot_roadmaps = HotRoadmapCache(max_bytes=int(os.environ.get('ROADMAP_HOT_CACHE_MAX_BYTES', str(64 * 1024 * 1024))))
+
+# Status check listing and retention (0 keeps status checks forever)
+STATUS_PAGE_MAX_LIMIT = 1000
+STATUS_STREAM_BATCH_SIZE = int(os.environ.get('STATUS_STREAM_BATCH_SIZE', '500'))
+STATUS_CHECK_RETENTION_DAYS = int(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '0'))
+
+# Roadmap cache keyed on the canonicalized student profile
+roadmap_cache = RoadmapCache(
+    collection=db.roadmap_cache,
+    max_entries=int(os.environ.get('ROADMAP_CACHE_MAX_ENTRIES', '1024')),
+    ttl_seconds=int(os.environ.get('ROADMAP_CACHE_TTL_SECONDS', '86400')),
+)
+roadmap_singleflight = SingleFlight()
+
+# Nearest-neighbour reuse of roadmaps generated for similar profiles (threshold 0 disables)
+similar_roadmaps = SimilarRoadmapIndex(
+    collection=db.roadmap_profiles,
+    threshold=float(os.environ.get('SIMILARITY_THRESHOLD', '0.92')),
+    refresh_seconds=float(os.environ.get('SIMILARITY_REFRESH_SECONDS', '30')),
+    variant=ROADMAP_VARIANT,
+)
+
+# Write-behind buffers: concurrent inserts share one insert_many per flush (max batch 1 disables)
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', '100'))
+WRITE_BEHIND_FLUSH_MS = float(os.environ.get('WRITE_BEHIND_FLUSH_MS', '5'))
+# Opt-in: acknowledge status checks before MongoDB has stored them
+STATUS_CHECK_FIRE_AND_FORGET = os.environ.get('STATUS_CHECK_FIRE_AND_FORGET', 'false').lower() == 'true'
+career_form_writes, career_roadmap_writes, status_check_writes = (
+    WriteBehindBuffer(collection, max_batch=WRITE_BEHIND_MAX_BATCH, flush_interval=WRITE_BEHIND_FLUSH_MS / 1000)
+    for collection in (db.career_forms, db.career_roadmaps, db.status_checks)
+)
+
 # Define Models
 class CareerFormInput(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -67,6 +254,18 @@ class CareerRoadmap(BaseModel):
     example_companies: List[str]
     interview_prep: InterviewPrep
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Revisions made by PATCH /api/roadmap point back at the roadmap they were derived from
+    parent_id: Optional[str] = None
+    revision: int = 1
+    # A fallback served while the LLM queue was shedding load, pending regeneration
+    degraded: bool = False
+
+class CareerFormUpdate(BaseModel):
+    degree: Optional[str] = None
+    year: Optional[str] = None
+    skills: Optional[str] = None
+    career_interest: Optional[str] = None
+    learning_style: Optional[str] = None
 
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -76,339 +275,1172 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
-# Helper function to generate career roadmap
-async def generate_career_roadmap(form_data: CareerFormInput) -> dict:
-    try:
-        # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"career_mentor_{form_data.id}",
-            system_message="You are an expert career mentor that creates comprehensive career roadmaps. You must respond only with valid JSON in the exact format requested, no additional text or explanations."
-        ).with_model("openai", "gpt-4o")
-        
-        # Create the enhanced prompt for better roadmaps
-        prompt = f"""
-Create a comprehensive, actionable career roadmap for a student with the following profile:
-- Degree/Field: {form_data.degree}
+# Helper functions shared by every roadmap generation path
+def create_roadmap_chat(form_data: CareerFormInput, session_suffix: str = "", max_tokens: Optional[int] = None):
+    load_llm_sdk()
+    session_id = f"career_mentor_{form_data.id}"
+    if session_suffix:
+        session_id = f"{session_id}_{session_suffix}"
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=session_id,
+        system_message="You are an expert career mentor that creates comprehensive career roadmaps. You must respond only with valid JSON in the exact format requested, no additional text or explanations."
+    ).with_model("openai", "gpt-4o")
+    if max_tokens:
+        chat = chat.with_max_tokens(max_tokens)
+    if LLM_JSON_MODE and hasattr(chat, "with_params"):
+        chat = chat.with_params(response_format={"type": "json_object"})
+    return chat
+
+def format_profile(form_data: CareerFormInput) -> str:
+    return f"""- Degree/Field: {form_data.degree}
 - Academic Year: {form_data.year}
 - Current Skills: {form_data.skills}
 - Target Career: {form_data.career_interest}
-- Learning Preference: {form_data.learning_style}
-
-Generate a detailed 12-18 month roadmap with 5-6 phases. Each phase should be 2-3 months long with clear, actionable goals.
-
-IMPORTANT GUIDELINES:
-1. Use REAL, working URLs from these trusted sources:
-   - Coursera.org, Udemy.com, edX.org for courses
-   - YouTube.com for video tutorials
-   - GitHub.com for code examples
-   - FreeCodeCamp.org for free programming content
-   - Kaggle.com for data science projects
-   - Medium.com for articles
-   - Pluralsight.com for tech training
-   - AWS, Google Cloud, Azure official documentation
-
-2. Focus areas should be specific, measurable skills
-3. Projects should build progressively in complexity
-4. Include both FREE and PAID resources clearly labeled
-5. Make learning paths realistic and time-bound
-
-Respond ONLY with valid JSON in this exact structure:
-{{
-  "roadmap": [
-    {{
-      "phase": "Months 1-2: Foundation Building",
-      "focus_areas": ["Specific skill with measurable outcome", "Another concrete skill", "Third focused area"],
-      "learning_resources": [
-        {{
-          "title": "Specific Course/Resource Name",
-          "type": "course",
-          "url": "https://coursera.org/learn/example-course"
-        }},
-        {{
-          "title": "YouTube Tutorial Series Name", 
-          "type": "video",
-          "url": "https://youtube.com/watch?v=example"
-        }},
-        {{
-          "title": "Free Resource Title",
-          "type": "article", 
-          "url": "https://freecodecamp.org/news/example"
-        }}
-      ],
-      "projects": [
-        {{
-          "title": "Descriptive Project Name",
-          "description": "Detailed description with specific technologies, expected outcomes, and key learning objectives. Mention estimated time to complete.",
-          "difficulty": "Beginner"
-        }}
-      ]
-    }},
-    {{
-      "phase": "Months 3-4: Skill Development",
-      "focus_areas": ["Next level skill 1", "Intermediate skill 2", "Practical application skill 3"],
-      "learning_resources": [
-        {{
-          "title": "Advanced Course Name",
-          "type": "course",
-          "url": "https://udemy.com/course/example"
-        }}
-      ],
-      "projects": [
-        {{
-          "title": "Intermediate Project Name", 
-          "description": "More complex project building on previous knowledge. Include specific features to implement and technologies to use.",
-          "difficulty": "Intermediate"
-        }}
-      ]
-    }}
-  ],
-  "job_roles": ["Entry Level Position", "Mid-Level Role", "Senior Position"],
-  "example_companies": ["Major Tech Company", "Growing Startup", "Enterprise Corporation", "Consulting Firm", "Remote-First Company"],
-  "interview_prep": {{
-    "important_topics": ["Technical Concept 1", "Practical Skill 2", "Industry Knowledge 3", "Soft Skill 4", "Problem Solving 5"],
-    "resources": [
-      {{
-        "title": "Interview Preparation Platform",
-        "url": "https://leetcode.com"
-      }},
-      {{
-        "title": "System Design Resource",
-        "url": "https://github.com/donnemartin/system-design-primer"
-      }},
-      {{
-        "title": "Behavioral Interview Guide",
-        "url": "https://medium.com/@example-behavioral-prep"
-      }}
-    ]
-  }}
-}}
+- Learning Preference: {form_data.learning_style}"""
+
+def build_roadmap_prompt(form_data: CareerFormInput) -> CompiledPrompt:
+    return compile_roadmap_prompt(
+        format_profile(form_data),
+        form_data.career_interest,
+        form_data.learning_style,
+        phases=ROADMAP_PHASES,
+        version=ROADMAP_PROMPT_VERSION
+    )
+
+def is_string_list(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, str) for item in value)
+
+def validate_roadmap_sections(roadmap_data: dict):
+    """Validate parsed LLM output section by section.
+
+    Returns the validated sections, the names of top-level sections that are
+    missing or invalid, and the positions of invalid phases (which are left as
+    None in the returned roadmap list).
+    """
+    valid = {}
+    invalid_sections = []
+    invalid_phases = []
+
+    phases = roadmap_data.get("roadmap")
+    if isinstance(phases, list) and phases:
+        valid["roadmap"] = []
+        for index, phase in enumerate(phases):
+            try:
+                valid["roadmap"].append(Phase(**phase).dict())
+            except Exception:
+                valid["roadmap"].append(None)
+                invalid_phases.append(index)
+    else:
+        invalid_sections.append("roadmap")
+
+    for section in ("job_roles", "example_companies"):
+        if is_string_list(roadmap_data.get(section)):
+            valid[section] = roadmap_data[section]
+        else:
+            invalid_sections.append(section)
+
+    try:
+        valid["interview_prep"] = InterviewPrep(**roadmap_data["interview_prep"]).dict()
+    except Exception:
+        invalid_sections.append("interview_prep")
+
+    return valid, invalid_sections, invalid_phases
+
+def build_section_repair_prompt(form_data: CareerFormInput, valid: dict, invalid_sections: List[str], invalid_phases: List[int]) -> str:
+    schemas = [SECTION_SCHEMAS[section] for section in invalid_sections]
+    instructions = []
+    if invalid_phases:
+        titles = [phase["phase"] for phase in valid.get("roadmap", []) if phase]
+        schemas.append(SECTION_SCHEMAS["phases"])
+        instructions.append(
+            f"Write {len(invalid_phases)} replacement phase(s) for positions "
+            f"{', '.join(str(index + 1) for index in invalid_phases)} of the roadmap, "
+            f"consistent with the existing phases: {', '.join(titles)}."
+        )
+    if "roadmap" in invalid_sections:
+        instructions.append("Write a complete roadmap of 5-6 progressive phases.")
+
+    return f"""
+Part of a career roadmap for this student could not be used and must be regenerated:
+{format_profile(form_data)}
+
+{" ".join(instructions)}
+Use real, working URLs. Respond ONLY with a valid JSON object containing exactly these keys:
+{{{", ".join(schemas)}}}
+"""
+
+async def repair_roadmap_sections(form_data: CareerFormInput, roadmap_data: dict) -> Tuple[dict, bool]:
+    """Re-request only the sections that failed validation instead of the whole roadmap.
+
+    Returns the roadmap and whether it is complete; an incomplete roadmap has
+    dropped phases or fallback sections and must not be cached.
+    """
+    with stage_seconds.time(stage="validation"):
+        valid, invalid_sections, invalid_phases = validate_roadmap_sections(roadmap_data)
+    if not invalid_sections and not invalid_phases:
+        return valid, True
+
+    roadmap_parse_stats["sections_rerequested"] += len(invalid_sections) + len(invalid_phases)
+    chat = create_roadmap_chat(form_data, "repair")
+    prompt = build_section_repair_prompt(form_data, valid, invalid_sections, invalid_phases)
+    try:
+        with stage_seconds.time(stage="llm_call"):
+            response = await llm_gateway.send(chat, UserMessage(text=prompt))
+        with stage_seconds.time(stage="json_parse"):
+            patch, _ = extract_json_object(response)
+    except CircuitOpenError:
+        patch = {}
+    except Exception as e:
+        logging.error(f"Error repairing roadmap sections: {str(e)}")
+        patch = {}
+
+    # Slot replacement phases back into their original positions
+    replacements = patch.pop("phases", None)
+    if invalid_phases and isinstance(replacements, list):
+        for index, phase in zip(invalid_phases, replacements):
+            valid["roadmap"][index] = phase
+    merged = {**valid, **{section: patch[section] for section in invalid_sections if section in patch}}
+
+    with stage_seconds.time(stage="validation"):
+        valid, invalid_sections, invalid_phases = validate_roadmap_sections(merged)
+    if not invalid_sections and not invalid_phases:
+        roadmap_parse_stats["section_repairs_succeeded"] += 1
+        return valid, True
 
-Create 5-6 progressive phases that build upon each other. Ensure all URLs are real and accessible. Focus on {form_data.career_interest} career path with {form_data.learning_style} learning approach.
+    # Whatever is still broken: drop bad phases, borrow other sections from the fallback
+    roadmap_parse_stats["section_repairs_incomplete"] += 1
+    fallback = create_fallback_roadmap(form_data)
+    if "roadmap" not in invalid_sections:
+        valid["roadmap"] = [phase for phase in valid["roadmap"] if phase is not None]
+        if not valid["roadmap"]:
+            invalid_sections.append("roadmap")
+    for section in invalid_sections:
+        valid[section] = fallback[section]
+    if invalid_sections:
+        roadmap_fallbacks.inc(reason="partial_sections")
+    return valid, False
+
+# Fan-out mode: every phase group is written against the same outline so the groups line up
+PHASE_OUTLINE = [
+    "Months 1-2: Foundation Building",
+    "Months 3-4: Skill Development",
+    "Months 5-6: Applied Projects",
+    "Months 7-8: Advanced Topics",
+    "Months 9-10: Specialization",
+    "Months 11-12: Portfolio & Job Readiness",
+]
+FANOUT_PHASE_GROUPS = [(0, 3), (3, 6)]
+DIFFICULTY_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+def build_phase_group_prompt(form_data: CareerFormInput, first: int, last: int) -> str:
+    outline = "\n".join(f"{index + 1}. {title}" for index, title in enumerate(PHASE_OUTLINE))
+    assigned = ", ".join(PHASE_OUTLINE[first:last])
+    return f"""
+Plan part of a 12-month career roadmap for a student with this profile:
+{format_profile(form_data)}
+
+The full roadmap follows this outline:
+{outline}
+
+Write ONLY these phases: {assigned}. Assume the student has completed every earlier phase and build on it; do not repeat earlier focus areas. Projects should grow in difficulty. Use real, working URLs from trusted sources (Coursera, Udemy, edX, YouTube, GitHub, FreeCodeCamp, Kaggle, official documentation).
+
+Respond ONLY with valid JSON:
+{{{SECTION_SCHEMAS["roadmap"]}}}
 """
+
+def build_career_outlook_prompt(form_data: CareerFormInput) -> str:
+    return f"""
+For a student with this profile:
+{format_profile(form_data)}
+
+List 3 realistic job roles (entry level to senior) and 5 example companies hiring for {form_data.career_interest}.
+Respond ONLY with valid JSON:
+{{{SECTION_SCHEMAS["job_roles"]}, {SECTION_SCHEMAS["example_companies"]}}}
+"""
+
+def build_interview_prep_prompt(form_data: CareerFormInput) -> str:
+    return f"""
+For a student with this profile:
+{format_profile(form_data)}
+
+List 5 important interview topics and 3 real, working interview preparation resources for {form_data.career_interest} roles.
+Respond ONLY with valid JSON:
+{{{SECTION_SCHEMAS["interview_prep"]}}}
+"""
+
+def harmonize_phases(phases: List[dict]) -> List[dict]:
+    """Consistency pass over independently generated phases.
+
+    Pins each phase to its slot in the outline, drops focus areas already
+    covered by an earlier phase and keeps project difficulty from going down.
+    """
+    seen_focus = set()
+    floor = 0
+    for index, phase in enumerate(phases[:len(PHASE_OUTLINE)]):
+        months = PHASE_OUTLINE[index].split(":", 1)[0]
+        if not phase["phase"].startswith(months):
+            title = phase["phase"].split(":", 1)[-1].strip()
+            phase["phase"] = f"{months}: {title}"
+
+        fresh = [area for area in phase["focus_areas"] if area.lower() not in seen_focus]
+        if fresh:
+            phase["focus_areas"] = fresh
+        seen_focus.update(area.lower() for area in phase["focus_areas"])
+
+        for project in phase["projects"]:
+            if project["difficulty"] in DIFFICULTY_LEVELS:
+                level = max(DIFFICULTY_LEVELS.index(project["difficulty"]), floor)
+                project["difficulty"] = DIFFICULTY_LEVELS[level]
+                floor = level
+    return phases
+
+# Helper function to generate career roadmap
+async def generate_career_roadmap(form_data: CareerFormInput) -> dict:
+    cache_key = canonical_profile_key(form_data, ROADMAP_VARIANT)
+    reusable_roadmap = await find_reusable_roadmap(form_data, cache_key)
+    if reusable_roadmap is not None:
+        return reusable_roadmap
+    return await new_career_roadmap(form_data, cache_key)
+
+async def find_reusable_roadmap(form_data: CareerFormInput, cache_key: str) -> Optional[dict]:
+    """A roadmap already generated for an identical or similar profile, if there is one"""
+    cached_roadmap = await roadmap_cache.get(cache_key)
+    if cached_roadmap is not None:
+        return cached_roadmap
+
+    try:
+        similar_roadmap = await similar_roadmaps.find(canonical_profile(form_data))
+    except Exception as e:
+        logging.error(f"Similar roadmap lookup failed: {str(e)}")
+        similar_roadmap = None
+    if similar_roadmap is not None:
+        await roadmap_cache.set(cache_key, similar_roadmap)
+    return similar_roadmap
+
+def admit_roadmap_generation(cache_key: str):
+    """Raise Overloaded if generating this roadmap would add to a saturated LLM queue"""
+    # Joining an identical generation already in flight adds no LLM load, so only new work is shed
+    if not roadmap_singleflight.joinable(cache_key):
+        llm_admission.admit()
+
+async def new_career_roadmap(form_data: CareerFormInput, cache_key: str) -> dict:
+    # Identical profiles submitted at the same moment share a single LLM call
+    return await roadmap_singleflight.do(cache_key, lambda: request_career_roadmap(form_data, cache_key))
+
+async def remember_roadmap(form_data: CareerFormInput, cache_key: str, roadmap_data: dict):
+    """Make a freshly generated roadmap reusable for identical and similar profiles"""
+    await roadmap_cache.set(cache_key, roadmap_data)
+    if similar_roadmaps.enabled:
+        try:
+            await similar_roadmaps.record(cache_key, canonical_profile(form_data), roadmap_data)
+        except Exception as e:
+            logging.error(f"Failed to record roadmap profile: {str(e)}")
+
+async def request_llm_json(form_data: CareerFormInput, prompt: str, session_suffix: str = "", max_tokens: Optional[int] = None) -> dict:
+    """Send one prompt through the gateway, hedged within the deadline budget, and parse the reply"""
+    attempts = 0
+
+    async def attempt() -> dict:
+        nonlocal attempts
+        suffix = "_".join(part for part in (session_suffix, str(attempts) if attempts else "") if part)
+        chat = create_roadmap_chat(form_data, suffix, max_tokens)
+        attempts += 1
         
         # Send message to LLM
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
+        with stage_seconds.time(stage="llm_call"):
+            response = await llm_gateway.send(chat, UserMessage(text=prompt))
         
-        # Parse JSON response
+        # Parse JSON response; an unparseable reply loses to a hedged attempt
         try:
-            roadmap_data = json.loads(response)
-            return roadmap_data
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
+            with stage_seconds.time(stage="json_parse"):
+                data, parse_path = extract_json_object(response)
+        except ValueError:
+            roadmap_parse_stats["unparseable"] += 1
             logging.error(f"Failed to parse JSON response: {response}")
-            return create_fallback_roadmap(form_data)
-            
+            raise
+        roadmap_parse_stats[parse_path] += 1
+        return data
+
+    return await llm_gateway.send_hedged(attempt, ROADMAP_DEADLINE_SECONDS)
+
+def roadmap_generation_mode(cache_key: str) -> str:
+    # Stable per profile, so the same student always lands in the same A/B arm
+    bucket = int(hashlib.sha256(cache_key.encode()).hexdigest()[:8], 16) % 100
+    return "fanout" if bucket < ROADMAP_FANOUT_PERCENT else "single"
+
+async def generate_roadmap_fanout(form_data: CareerFormInput) -> dict:
+    """Generate phase groups, career outlook and interview prep as concurrent smaller prompts"""
+    prompts = [
+        (f"phases{index}", build_phase_group_prompt(form_data, first, last), max_output_tokens(last - first))
+        for index, (first, last) in enumerate(FANOUT_PHASE_GROUPS)
+    ]
+    prompts.append(("outlook", build_career_outlook_prompt(form_data), None))
+    prompts.append(("interview", build_interview_prep_prompt(form_data), None))
+
+    results = await asyncio.gather(
+        *[request_llm_json(form_data, prompt, suffix, max_tokens) for suffix, prompt, max_tokens in prompts],
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if len(errors) == len(results):
+        raise errors[0]
+    for error in errors:
+        if isinstance(error, CircuitOpenError):
+            raise error
+
+    # Phases keep their outline slots; slots left empty by a failed group are
+    # invalid phases that repair_roadmap_sections re-requests by position
+    merged = {"roadmap": [None] * FANOUT_PHASE_GROUPS[-1][1]}
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logging.error(f"Fan-out roadmap section failed: {str(result)}")
+            continue
+        phases = result.pop("roadmap", None)
+        if index < len(FANOUT_PHASE_GROUPS) and isinstance(phases, list):
+            first, last = FANOUT_PHASE_GROUPS[index]
+            merged["roadmap"][first:first + len(phases[:last - first])] = phases[:last - first]
+        merged.update(result)
+    return merged
+
+async def request_career_roadmap(form_data: CareerFormInput, cache_key: str) -> dict:
+    mode = roadmap_generation_mode(cache_key)
+    started = time.monotonic()
+    try:
+        if mode == "fanout":
+            roadmap_data = await generate_roadmap_fanout(form_data)
+        else:
+            prompt = build_roadmap_prompt(form_data)
+            roadmap_data = await request_llm_json(form_data, prompt.text, max_tokens=prompt.max_output_tokens)
+        roadmap_data, complete = await repair_roadmap_sections(form_data, roadmap_data)
+        # Only a complete roadmap has every phase in its outline slot
+        if mode == "fanout" and complete:
+            roadmap_data["roadmap"] = harmonize_phases(roadmap_data["roadmap"])
+    except CircuitOpenError:
+        # The provider is known to be unhealthy; serve the fallback right away
+        roadmap_fallbacks.inc(reason="circuit_open")
+        return create_fallback_roadmap(form_data)
+    except ValueError:
+        # Fallback if JSON parsing fails
+        roadmap_fallbacks.inc(reason="json_decode")
+        return create_fallback_roadmap(form_data)
+    except asyncio.TimeoutError:
+        logging.error(f"Roadmap generation exceeded its {ROADMAP_DEADLINE_SECONDS}s deadline budget")
+        roadmap_fallbacks.inc(reason="timeout")
+        return create_fallback_roadmap(form_data)
     except Exception as e:
         logging.error(f"Error generating roadmap: {str(e)}")
+        roadmap_fallbacks.inc(reason="llm_exception")
         return create_fallback_roadmap(form_data)
 
+    roadmap_generation_stats[f"{mode}_requests"] += 1
+    roadmap_generation_stats[f"{mode}_seconds"] += time.monotonic() - started
+
+    # Only complete LLM output is cached; fallbacks and partial repairs should be retried next time
+    if complete:
+        await remember_roadmap(form_data, cache_key, roadmap_data)
+    return roadmap_data
+
 def create_fallback_roadmap(form_data: CareerFormInput) -> dict:
-    """Enhanced fallback roadmap if AI generation fails"""
-    career_field = form_data.career_interest.lower()
-    
-    # Customize based on career interest
-    if "ai" in career_field or "ml" in career_field or "data" in career_field:
-        focus_areas_1 = ["Python Programming", "Statistics & Math", "Data Analysis with Pandas"]
-        focus_areas_2 = ["Machine Learning Algorithms", "Data Visualization", "SQL Databases"]
-        projects_1 = "Build a data analysis project using real datasets to understand data cleaning, exploration, and basic visualization techniques."
-        projects_2 = "Create a machine learning model to predict outcomes using supervised learning algorithms like linear regression or decision trees."
-        job_roles = ["Data Analyst", "ML Engineer", "Data Scientist"]
-        companies = ["Google", "Netflix", "Uber", "Airbnb", "Meta"]
-    elif "web" in career_field:
-        focus_areas_1 = ["HTML/CSS Fundamentals", "JavaScript Basics", "Version Control (Git)"]
-        focus_areas_2 = ["React Framework", "Backend Development", "Database Integration"]
-        projects_1 = "Create a responsive personal portfolio website using HTML, CSS, and JavaScript with modern design principles."
-        projects_2 = "Build a full-stack web application with React frontend and Node.js backend, including user authentication."
-        job_roles = ["Frontend Developer", "Full-Stack Developer", "Web Developer"]
-        companies = ["Shopify", "Stripe", "Vercel", "Netlify", "GitHub"]
+    """Template roadmap for the student's career track if AI generation fails"""
+    fallback = fallback_engine.render(form_data.career_interest, form_data.skills, form_data.learning_style)
+    return fallback.to_dict()
+
+def roadmap_document(roadmap: CareerRoadmap) -> dict:
+    """Mongo document for a roadmap, carrying the exact bytes GET /api/roadmap will serve"""
+    doc = roadmap.dict()
+    # MongoDB keeps milliseconds; trimming first makes the body identical however the document is read back
+    doc["timestamp"] = doc["timestamp"].replace(microsecond=doc["timestamp"].microsecond // 1000 * 1000)
+    doc["blob"], doc["blob_encoding"], doc["etag"] = encode_roadmap_blob(doc, ROADMAP_BLOB_COMPRESS_MIN_BYTES)
+    return doc
+
+async def stored_roadmap_documents(docs: List[dict]) -> List[dict]:
+    """Documents as they are written to career_roadmaps under the configured storage mode"""
+    if ROADMAP_STORAGE_MODE == STORAGE_NORMALIZED:
+        return await resource_store.intern(docs)
+    return docs
+
+async def find_roadmap(roadmap_id: str, projection: dict) -> Optional[dict]:
+    roadmap = await db.career_roadmaps.find_one({"id": roadmap_id}, projection)
+    if roadmap and roadmap.get("storage") == STORAGE_NORMALIZED:
+        roadmap = await resource_store.expand(roadmap)
+    return roadmap
+
+async def save_roadmap(form_id: str, roadmap_data: dict, **revision_fields) -> CareerRoadmap:
+    roadmap = CareerRoadmap(form_id=form_id, **roadmap_data, **revision_fields)
+    doc = roadmap_document(roadmap)
+    with stage_seconds.time(stage="roadmap_insert"):
+        stored, = await stored_roadmap_documents([doc])
+        await career_roadmap_writes.insert(stored)
+    analytics_rollups.record_roadmap(roadmap)
+    # Students open their roadmap right after submitting, so warm the hot cache now
+    hot_roadmaps.put(roadmap.id, doc["blob"], doc["blob_encoding"], doc["etag"])
+    return roadmap
+
+async def process_roadmap_job(job: dict) -> dict:
+    # A retried job may already have stored its roadmap before the worker died
+    existing = await db.career_roadmaps.find_one(
+        {"form_id": job["form_id"], "degraded": {"$ne": True}}, {"_id": 0, "id": 1}
+    )
+    if existing:
+        return {"roadmap_id": existing["id"]}
+
+    form = await db.career_forms.find_one({"id": job["form_id"]}, {"_id": 0})
+    if not form:
+        raise ValueError(f"Career form {job['form_id']} not found")
+    input_data = CareerFormInput(**form)
+    roadmap_data = await generate_career_roadmap(input_data)
+
+    # Regenerating a degraded roadmap stores the result as its next revision
+    degraded = await db.career_roadmaps.find_one(
+        {"form_id": job["form_id"], "degraded": True}, {"_id": 0, "id": 1, "revision": 1}
+    )
+    revision_fields = {"parent_id": degraded["id"], "revision": degraded.get("revision", 1) + 1} if degraded else {}
+    roadmap = await save_roadmap(input_data.id, roadmap_data, **revision_fields)
+    return {"roadmap_id": roadmap.id}
+
+# Background workers for async career form submissions
+roadmap_jobs = RoadmapJobQueue(
+    collection=db.roadmap_jobs,
+    handler=process_roadmap_job,
+    workers=int(os.environ.get('ROADMAP_JOB_WORKERS', '4')),
+    lease_seconds=int(os.environ.get('ROADMAP_JOB_LEASE_SECONDS', '300')),
+    max_attempts=int(os.environ.get('ROADMAP_JOB_MAX_ATTEMPTS', '3')),
+)
+
+# Streaming helpers for the SSE variant of the career form
+ROADMAP_SECTIONS = ("job_roles", "example_companies", "interview_prep")
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def roadmap_events(roadmap_data: dict):
+    for phase in roadmap_data["roadmap"]:
+        yield format_sse("phase", phase)
+    for section in ROADMAP_SECTIONS:
+        yield format_sse(section, roadmap_data[section])
+
+async def stream_llm_text(chat, user_message):
+    """Yield model output as it arrives; clients without streaming support yield it in one piece"""
+    stream_message = getattr(chat, "stream_message", None)
+    async with llm_gateway.slot():
+        if stream_message is None:
+            yield await asyncio.wait_for(chat.send_message(user_message), llm_gateway.timeout_seconds)
+            return
+        # Like send, the whole call is bounded; a stalled stream times out and counts against the breaker
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(llm_gateway.timeout_seconds, ROADMAP_DEADLINE_SECONDS)
+        chunks = stream_message(user_message).__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+def fallback_reason(error: Exception) -> str:
+    """The roadmap_fallbacks reason for a failed generation, as request_career_roadmap reports it"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, ValueError):
+        return "json_decode"
+    return "llm_exception"
+
+async def stream_career_roadmap(input_data: CareerFormInput, degraded: bool = False):
+    cache_key = canonical_profile_key(input_data, ROADMAP_VARIANT)
+    # A degraded stream was shed by admission control and serves the fallback without calling the LLM
+    roadmap_data = create_fallback_roadmap(input_data) if degraded else await roadmap_cache.get(cache_key)
+
+    if roadmap_data is not None:
+        for event in roadmap_events(roadmap_data):
+            yield event
     else:
-        focus_areas_1 = ["Technical Fundamentals", "Industry Knowledge", "Communication Skills"]
-        focus_areas_2 = ["Advanced Concepts", "Project Experience", "Professional Development"]
-        projects_1 = "Complete a foundational project in your field to demonstrate core competencies and technical understanding."
-        projects_2 = "Develop an intermediate-level project that showcases problem-solving skills and practical application."
-        job_roles = ["Entry-Level Specialist", "Junior Consultant", "Associate"]
-        companies = ["Accenture", "Deloitte", "IBM", "Cisco", "Oracle"]
-    
-    return {
-        "roadmap": [
-            {
-                "phase": "Months 1-2: Foundation Building",
-                "focus_areas": focus_areas_1,
-                "learning_resources": [
-                    {
-                        "title": "FreeCodeCamp Curriculum",
-                        "type": "course",
-                        "url": "https://www.freecodecamp.org/learn"
-                    },
-                    {
-                        "title": "Coursera Beginner Course",
-                        "type": "course", 
-                        "url": "https://www.coursera.org/browse"
-                    },
-                    {
-                        "title": "YouTube Learning Playlist",
-                        "type": "video",
-                        "url": "https://www.youtube.com/results?search_query=beginner+tutorial"
-                    }
-                ],
-                "projects": [
-                    {
-                        "title": "Foundation Project",
-                        "description": projects_1,
-                        "difficulty": "Beginner"
-                    }
-                ]
-            },
-            {
-                "phase": "Months 3-4: Skill Development", 
-                "focus_areas": focus_areas_2,
-                "learning_resources": [
-                    {
-                        "title": "Udemy Advanced Course",
-                        "type": "course",
-                        "url": "https://www.udemy.com"
-                    },
-                    {
-                        "title": "GitHub Learning Resources",
-                        "type": "article",
-                        "url": "https://github.com/topics"
-                    },
-                    {
-                        "title": "Medium Technical Articles",
-                        "type": "article", 
-                        "url": "https://medium.com/topic/programming"
-                    }
-                ],
-                "projects": [
-                    {
-                        "title": "Intermediate Portfolio Project",
-                        "description": projects_2,
-                        "difficulty": "Intermediate"
-                    }
-                ]
-            },
-            {
-                "phase": "Months 5-6: Advanced Application",
-                "focus_areas": ["Advanced Skills", "Industry Best Practices", "Professional Networking"],
-                "learning_resources": [
-                    {
-                        "title": "Pluralsight Learning Path",
-                        "type": "course",
-                        "url": "https://www.pluralsight.com"
-                    },
-                    {
-                        "title": "Industry Documentation",
-                        "type": "article",
-                        "url": "https://developer.mozilla.org"
-                    }
-                ],
-                "projects": [
-                    {
-                        "title": "Capstone Project",
-                        "description": "Create a comprehensive project that demonstrates mastery of multiple skills and can serve as a portfolio centerpiece for job applications.",
-                        "difficulty": "Advanced"
-                    }
-                ]
-            }
-        ],
-        "job_roles": job_roles,
-        "example_companies": companies,
-        "interview_prep": {
-            "important_topics": ["Technical Skills Assessment", "Problem Solving", "Communication", "Industry Knowledge", "Project Discussion"],
-            "resources": [
-                {
-                    "title": "LeetCode Practice",
-                    "type": "course",
-                    "url": "https://leetcode.com"
-                },
-                {
-                    "title": "InterviewBit Preparation",
-                    "type": "course",
-                    "url": "https://www.interviewbit.com"
-                },
-                {
-                    "title": "Glassdoor Interview Experiences",
-                    "type": "article",
-                    "url": "https://www.glassdoor.com"
-                }
-            ]
-        }
+        parser = RoadmapStreamParser()
+        try:
+            prompt = build_roadmap_prompt(input_data)
+            chat = create_roadmap_chat(input_data, max_tokens=prompt.max_output_tokens)
+            user_message = UserMessage(text=prompt.text)
+            chunks = stream_llm_text(chat, user_message)
+            try:
+                async for chunk in chunks:
+                    for section, value in parser.feed(chunk):
+                        if section == "phase":
+                            yield format_sse("phase", Phase(**value).dict())
+                        elif section in ROADMAP_SECTIONS:
+                            yield format_sse(section, value)
+            finally:
+                # Release the LLM slot promptly even when we stop reading early
+                await chunks.aclose()
+            if not parser.complete:
+                raise ValueError("LLM response ended before the roadmap JSON was complete")
+            roadmap_data = parser.document
+            CareerRoadmap(form_id=input_data.id, **roadmap_data)
+            await remember_roadmap(input_data, cache_key, roadmap_data)
+        except Exception as e:
+            logging.error(f"Error streaming roadmap: {str(e)}")
+            roadmap_fallbacks.inc(reason=fallback_reason(e))
+            roadmap_data = create_fallback_roadmap(input_data)
+            # Anything already sent is superseded by the fallback roadmap
+            yield format_sse("reset", {"reason": "fallback"})
+            for event in roadmap_events(roadmap_data):
+                yield event
+
+    try:
+        roadmap = await save_roadmap(input_data.id, roadmap_data, degraded=degraded)
+    except Exception as e:
+        logging.error(f"Error storing streamed roadmap: {str(e)}")
+        yield format_sse("error", {"detail": "Failed to store roadmap"})
+        return
+
+    yield format_sse("done", {
+        "success": True,
+        "form_id": input_data.id,
+        "roadmap_id": roadmap.id,
+        "degraded": degraded
+    })
+
+ROADMAP_FIELDS = set(CareerRoadmap.model_fields)
+ROADMAP_BLOB_PROJECTION = {"_id": 0, "blob": 1, "blob_encoding": 1, "etag": 1}
+
+def roadmap_projection(fields: Optional[str] = None) -> dict:
+    """Build a find() projection from a comma-separated field list, never including _id or the blob"""
+    projection = {"_id": 0}
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - ROADMAP_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown roadmap fields: {', '.join(sorted(unknown))}")
+        projection.update({field: 1 for field in requested})
+        # Tells find_roadmap whether resources and projects need expanding; never returned
+        projection["storage"] = 1
+    else:
+        projection.update({"blob": 0, "blob_encoding": 0, "etag": 0})
+    return projection
+
+def roadmap_blob_response(doc: dict, request: Request) -> Response:
+    """Serve the stored body as-is, passing deflated bodies straight through when the client accepts them"""
+    # no-cache lets browsers keep the body but revalidate it with If-None-Match on every load
+    headers = {"Vary": "Accept-Encoding", "ETag": doc["etag"], "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, doc["etag"]):
+        hot_roadmaps.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    body = doc["blob"]
+    if doc["blob_encoding"] == BLOB_DEFLATE and "deflate" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "deflate"
+    else:
+        body = decode_roadmap_blob(body, doc["blob_encoding"])
+    return Response(content=bytes(body), media_type="application/json", headers=headers)
+
+# Keyset pagination helpers for status checks; the cursor is the last (timestamp, id) seen
+def encode_status_check(doc: dict) -> dict:
+    doc["timestamp"] = doc["timestamp"].isoformat()
+    return doc
+
+def encode_status_cursor(doc: dict) -> str:
+    return base64.urlsafe_b64encode(f"{doc['timestamp']}|{doc['id']}".encode()).decode()
+
+def status_checks_after(cursor: str) -> dict:
+    try:
+        timestamp, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        timestamp = datetime.fromisoformat(timestamp)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": last_id}}
+    ]}
+
+async def stream_status_checks(cursor):
+    async for doc in cursor:
+        yield json.dumps(encode_status_check(doc)) + "\n"
+
+# Incremental roadmap updates
+ROADMAP_CONTENT_FIELDS = ("roadmap", "job_roles", "example_companies", "interview_prep")
+
+def affected_phases(phases: List[dict], old_form: CareerFormInput, new_form: CareerFormInput) -> List[int]:
+    """Positions of the phases a profile change invalidates"""
+    old_profile = canonical_profile(old_form)
+    new_profile = canonical_profile(new_form)
+    if old_profile["year"] != new_profile["year"] or old_profile["learning_style"] != new_profile["learning_style"]:
+        return list(range(len(phases)))
+
+    changed_skills = set(old_profile["skills"]) ^ set(new_profile["skills"])
+    # Skills match whole words only, so "r" or "go" never matches inside "react" or "google"
+    skill_phrases = {phrase for phrase in (" ".join(TOKEN_RE.findall(skill)) for skill in changed_skills) if phrase}
+    affected = set()
+    for index, phase in enumerate(phases):
+        text = " ".join(
+            phase["focus_areas"] + [f"{project['title']} {project['description']}" for project in phase["projects"]]
+        )
+        words = f" {' '.join(TOKEN_RE.findall(text.lower()))} "
+        if any(f" {phrase} " in words for phrase in skill_phrases):
+            affected.add(index)
+
+    # The foundation phase is written around the student's starting point
+    if phases and ((changed_skills and not affected) or old_profile["degree"] != new_profile["degree"]):
+        affected.add(0)
+    return sorted(affected)
+
+def build_phase_update_prompt(form_data: CareerFormInput, phases: List[dict], positions: List[int]) -> str:
+    outline = "\n".join(
+        f"{index + 1}. {phase['phase']} - {', '.join(phase['focus_areas'])}" for index, phase in enumerate(phases)
+    )
+    return f"""
+A student's profile has changed. Their updated profile:
+{format_profile(form_data)}
+
+Their current roadmap phases and focus areas:
+{outline}
+
+Rewrite ONLY phase(s) {', '.join(str(index + 1) for index in positions)} for the updated profile, in that order. Keep each phase's months, stay consistent with the phases around it and skip anything the student already knows. Use real, working URLs.
+Respond ONLY with valid JSON:
+{{{SECTION_SCHEMAS["phases"]}}}
+"""
+
+async def regenerate_phases(form_data: CareerFormInput, phases: List[dict], positions: List[int]):
+    """Ask the LLM for just the given phases; returns the new phase list and the positions actually replaced"""
+    patch = await request_llm_json(
+        form_data, build_phase_update_prompt(form_data, phases, positions), "update", max_output_tokens(len(positions))
+    )
+    replacements = patch.get("phases")
+    if not isinstance(replacements, list):
+        raise ValueError("LLM response has no phases")
+
+    phases = list(phases)
+    replaced = []
+    for index, phase in zip(positions, replacements):
+        try:
+            phases[index] = Phase(**phase).dict()
+            replaced.append(index)
+        except Exception:
+            # An invalid replacement keeps the existing phase
+            continue
+    return phases, replaced
+
+# Batch helpers for cohort imports
+async def generate_batch_item(index: int, input_data: CareerFormInput, semaphore: asyncio.Semaphore) -> dict:
+    result = {"index": index, "form_id": input_data.id}
+    cache_key = canonical_profile_key(input_data, ROADMAP_VARIANT)
+    degraded = False
+    try:
+        async with semaphore:
+            roadmap_data = await find_reusable_roadmap(input_data, cache_key)
+            if roadmap_data is None:
+                # Imports pass the same admission as interactive forms, so they never crowd them out
+                try:
+                    admit_roadmap_generation(cache_key)
+                except Overloaded as e:
+                    if llm_admission.mode == ADMISSION_REJECT:
+                        result.update(error="Roadmap generation is at capacity, please retry shortly", retry_after=e.retry_after)
+                        return result
+                    roadmap_fallbacks.inc(reason="shed")
+                    roadmap_data = create_fallback_roadmap(input_data)
+                    degraded = True
+                else:
+                    roadmap_data = await new_career_roadmap(input_data, cache_key)
+        result["roadmap"] = CareerRoadmap(form_id=input_data.id, **roadmap_data, degraded=degraded)
+    except Exception as e:
+        logging.error(f"Error generating roadmap for batch item {index}: {str(e)}")
+        result["error"] = str(e)
+    return result
+
+async def stream_batch_roadmaps(forms: List[CareerFormInput]):
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    pending = {
+        asyncio.ensure_future(generate_batch_item(index, input_data, semaphore))
+        for index, input_data in enumerate(forms)
     }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            results = [task.result() for task in done]
+
+            # Everything that finished together is written back in one round trip
+            roadmaps = [result["roadmap"] for result in results if "roadmap" in result]
+            if roadmaps:
+                try:
+                    docs = [roadmap_document(roadmap) for roadmap in roadmaps]
+                    await db.career_roadmaps.insert_many(await stored_roadmap_documents(docs), ordered=False)
+                    for roadmap in roadmaps:
+                        analytics_rollups.record_roadmap(roadmap)
+                    for doc in docs:
+                        hot_roadmaps.put(doc["id"], doc["blob"], doc["blob_encoding"], doc["etag"])
+                except Exception as e:
+                    logging.error(f"Error storing batch roadmaps: {str(e)}")
+                    for result in results:
+                        if result.pop("roadmap", None) is not None:
+                            result["error"] = "Failed to store roadmap"
+
+            for result in results:
+                roadmap = result.pop("roadmap", None)
+                if roadmap is not None:
+                    result.update({
+                        "success": True,
+                        "roadmap_id": roadmap.id,
+                        "roadmap": roadmap.dict(include={"roadmap", "job_roles", "example_companies", "interview_prep"}),
+                        "degraded": roadmap.degraded
+                    })
+                    if roadmap.degraded and ADMISSION_REGENERATE_DEGRADED:
+                        job = await roadmap_jobs.enqueue(roadmap.form_id)
+                        result["job_id"] = job["id"]
+                else:
+                    result["success"] = False
+                yield json.dumps(result) + "\n"
+    finally:
+        # Stop generating if the client goes away mid-stream
+        for task in pending:
+            task.cancel()
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "AI Career Mentor API is running!"}
 
+def client_address(request: Request) -> str:
+    """The address rate limits are keyed on.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so only the last TRUSTED_PROXY_HOPS entries were
+    written by our own proxies; anything to their left came from the client.
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+def limit_career_form_rate(request: Request):
+    retry_after = career_form_limiter.acquire(client_address(request))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many career form submissions",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def capacity_exceeded(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Roadmap generation is at capacity, please retry shortly",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @api_router.post("/career-form", response_model=dict)
-async def submit_career_form(input_data: CareerFormInput):
+async def submit_career_form(input_data: CareerFormInput, request: Request, async_mode: bool = False):
+    limit_career_form_rate(request)
+
     try:
-        # Store form data
-        form_dict = input_data.dict()
-        await db.career_forms.insert_one(form_dict)
+        # Opt-in: hand generation to the background workers and return immediately
+        if async_mode:
+            await timed("form_insert", career_form_writes.insert(input_data.dict()))
+            analytics_rollups.record_form(input_data)
+            job = await roadmap_jobs.enqueue(input_data.id)
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "form_id": input_data.id,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['id']}"
+            })
         
-        # Generate roadmap using AI
-        roadmap_data = await generate_career_roadmap(input_data)
-        
-        # Create roadmap object
-        roadmap = CareerRoadmap(
-            form_id=input_data.id,
-            **roadmap_data
-        )
+        # Decide on admission to the LLM queue before storing anything, so a rejected form leaves no trace
+        cache_key = canonical_profile_key(input_data, ROADMAP_VARIANT)
+        roadmap_data = await find_reusable_roadmap(input_data, cache_key)
+        degraded = False
+        if roadmap_data is None:
+            try:
+                admit_roadmap_generation(cache_key)
+            except Overloaded as e:
+                if llm_admission.mode == ADMISSION_REJECT:
+                    raise capacity_exceeded(e)
+                roadmap_fallbacks.inc(reason="shed")
+                roadmap_data = create_fallback_roadmap(input_data)
+                degraded = True
+
+        # Store form data while the roadmap is generated; it is only awaited alongside the roadmap
+        form_write = asyncio.ensure_future(timed("form_insert", career_form_writes.insert(input_data.dict())))
+        if roadmap_data is None:
+            roadmap_data = await new_career_roadmap(input_data, cache_key)
+        await form_write
+        analytics_rollups.record_form(input_data)
         
-        # Store roadmap
-        roadmap_dict = roadmap.dict()
-        await db.career_roadmaps.insert_one(roadmap_dict)
+        # Create and store roadmap
+        roadmap = await save_roadmap(input_data.id, roadmap_data, degraded=degraded)
         
-        return {
+        response = {
             "success": True,
             "form_id": input_data.id,
             "roadmap_id": roadmap.id,
-            "roadmap": roadmap_data
+            "roadmap": roadmap_data,
+            "degraded": degraded
         }
+        if degraded and ADMISSION_REGENERATE_DEGRADED:
+            job = await roadmap_jobs.enqueue(input_data.id)
+            response["job_id"] = job["id"]
+            response["status_url"] = f"/api/jobs/{job['id']}"
+        return response
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in career form submission: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process career form: {str(e)}")
+
+@api_router.post("/career-form/stream")
+async def submit_career_form_stream(input_data: CareerFormInput, request: Request):
+    limit_career_form_rate(request)
+
+    degraded = False
+    try:
+        if await roadmap_cache.get(canonical_profile_key(input_data, ROADMAP_VARIANT)) is None:
+            try:
+                llm_admission.admit()
+            except Overloaded as e:
+                if llm_admission.mode == ADMISSION_REJECT:
+                    raise capacity_exceeded(e)
+                roadmap_fallbacks.inc(reason="shed")
+                degraded = True
+        await career_form_writes.insert(input_data.dict())
+        analytics_rollups.record_form(input_data)
+        if degraded and ADMISSION_REGENERATE_DEGRADED:
+            await roadmap_jobs.enqueue(input_data.id)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in career form submission: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process career form: {str(e)}")
 
+    return StreamingResponse(
+        stream_career_roadmap(input_data, degraded=degraded),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/career-forms/batch")
+async def submit_career_forms_batch(forms: List[CareerFormInput], request: Request):
+    if not forms:
+        raise HTTPException(status_code=400, detail="At least one career form is required")
+    if len(forms) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} career forms")
+    limit_career_form_rate(request)
+    # Each item is admitted on its own as it is generated; a batch arriving at capacity is not stored at all
+    if llm_admission.mode == ADMISSION_REJECT and llm_admission.enabled and llm_admission.overloaded():
+        raise capacity_exceeded(Overloaded(llm_admission.retry_after()))
+
+    try:
+        await db.career_forms.insert_many([input_data.dict() for input_data in forms])
+        for input_data in forms:
+            analytics_rollups.record_form(input_data)
+    except Exception as e:
+        logging.error(f"Error in batch career form submission: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process career forms: {str(e)}")
+
+    return StreamingResponse(stream_batch_roadmaps(forms), media_type="application/x-ndjson")
+
 @api_router.get("/roadmap/{roadmap_id}")
-async def get_roadmap(roadmap_id: str):
+async def get_roadmap(roadmap_id: str, request: Request, fields: Optional[str] = None):
+    projection = roadmap_projection(fields)
     try:
-        roadmap = await db.career_roadmaps.find_one({"id": roadmap_id})
+        # Fast path: return the body serialized at write time without decoding the document
+        if not fields:
+            doc = hot_roadmaps.get(roadmap_id)
+            if doc is None:
+                # Normalized documents have no blob, so they are fetched whole in a single round trip
+                cold_projection = {"_id": 0} if ROADMAP_STORAGE_MODE == STORAGE_NORMALIZED else ROADMAP_BLOB_PROJECTION
+                with stage_seconds.time(stage="roadmap_read"):
+                    doc = await db.career_roadmaps.find_one({"id": roadmap_id}, cold_projection)
+                    if doc is not None and "blob" not in doc and "id" not in doc:
+                        doc = await db.career_roadmaps.find_one({"id": roadmap_id}, {"_id": 0})
+                if doc is None:
+                    raise HTTPException(status_code=404, detail="Roadmap not found")
+                if "blob" not in doc:
+                    # Roadmaps stored before blobs existed, or normalized, are serialized on first read.
+                    # The etag stored at write time covers the same bytes, so every worker sends the same one
+                    stored_etag = doc.pop("etag", None)
+                    if doc.get("storage") == STORAGE_NORMALIZED:
+                        doc = await resource_store.expand(doc)
+                    blob, blob_encoding, etag = encode_roadmap_blob(doc, ROADMAP_BLOB_COMPRESS_MIN_BYTES)
+                    doc = {"blob": blob, "blob_encoding": blob_encoding, "etag": stored_etag or etag}
+                elif "etag" not in doc:
+                    doc["etag"] = blob_etag(doc["blob"], doc["blob_encoding"])
+                hot_roadmaps.put(roadmap_id, doc["blob"], doc["blob_encoding"], doc["etag"])
+            return roadmap_blob_response(doc, request)
+
+        # The projection keeps MongoDB's _id off the wire entirely
+        with stage_seconds.time(stage="roadmap_read"):
+            roadmap = await find_roadmap(roadmap_id, projection)
         if not roadmap:
             raise HTTPException(status_code=404, detail="Roadmap not found")
         
-        # Convert MongoDB document to proper format
-        roadmap.pop('_id', None)  # Remove MongoDB _id field
         return roadmap
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching roadmap: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch roadmap")
 
+@api_router.patch("/roadmap/{roadmap_id}", response_model=dict)
+async def update_roadmap(roadmap_id: str, changes: CareerFormUpdate):
+    try:
+        roadmap = await find_roadmap(roadmap_id, roadmap_projection())
+        if not roadmap:
+            raise HTTPException(status_code=404, detail="Roadmap not found")
+        form = await db.career_forms.find_one({"id": roadmap["form_id"]}, {"_id": 0})
+        if not form:
+            raise HTTPException(status_code=404, detail="Career form for this roadmap not found")
+
+        old_form = CareerFormInput(**form)
+        new_form = CareerFormInput(**{**{field: form[field] for field in PROFILE_FIELDS}, **changes.dict(exclude_none=True)})
+        roadmap_data = {field: roadmap[field] for field in ROADMAP_CONTENT_FIELDS}
+        if canonical_profile_key(new_form) == canonical_profile_key(old_form):
+            return {
+                "success": True,
+                "form_id": old_form.id,
+                "roadmap_id": roadmap_id,
+                "revision": roadmap.get("revision", 1),
+                "changed_phases": [],
+                "roadmap": roadmap_data
+            }
+
+        if canonical_profile(new_form)["career_interest"] != canonical_profile(old_form)["career_interest"]:
+            # A new target career changes everything; nothing is worth keeping
+            roadmap_data = await generate_career_roadmap(new_form)
+            changed_phases = list(range(len(roadmap_data["roadmap"])))
+        else:
+            changed_phases = affected_phases(roadmap_data["roadmap"], old_form, new_form)
+            if changed_phases:
+                try:
+                    roadmap_data["roadmap"], changed_phases = await regenerate_phases(
+                        new_form, roadmap_data["roadmap"], changed_phases
+                    )
+                except (CircuitOpenError, asyncio.TimeoutError) as e:
+                    logging.error(f"Roadmap update unavailable: {str(e)}")
+                    raise HTTPException(status_code=503, detail="Roadmap updates are temporarily unavailable")
+                except ValueError as e:
+                    # The reply could not be parsed or had no phases; never echo it back to the client
+                    logging.error(f"Unusable roadmap update from the LLM: {str(e)}")
+                    raise HTTPException(status_code=502, detail="The roadmap update could not be generated, please retry")
+                if not changed_phases:
+                    # Every replacement failed validation; a revision identical to its parent is no update
+                    logging.error("Roadmap update from the LLM had no valid phases")
+                    raise HTTPException(status_code=502, detail="The roadmap update could not be generated, please retry")
+
+        # The form is only stored once there is a revision to go with it
+        await career_form_writes.insert(new_form.dict())
+        analytics_rollups.record_form(new_form)
+
+        # The revision copies the unchanged phases as-is; only changed_phases came from the LLM
+        revision = await save_roadmap(
+            new_form.id,
+            roadmap_data,
+            parent_id=roadmap_id,
+            revision=roadmap.get("revision", 1) + 1
+        )
+        return {
+            "success": True,
+            "form_id": new_form.id,
+            "roadmap_id": revision.id,
+            "parent_id": roadmap_id,
+            "revision": revision.revision,
+            "changed_phases": changed_phases,
+            "roadmap": roadmap_data
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error updating roadmap: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update roadmap: {str(e)}")
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    try:
+        job = await roadmap_jobs.get(job_id)
+    except Exception as e:
+        logging.error(f"Error fetching job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch job")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["roadmap_id"]:
+        job["roadmap"] = await find_roadmap(job["roadmap_id"], roadmap_projection())
+    return job
+
+@api_router.get("/llm/stats")
+async def get_llm_stats():
+    return {
+        **llm_gateway.snapshot(),
+        "admission": llm_admission.snapshot(),
+        "rate_limit": career_form_limiter.snapshot(),
+        "parsing": dict(roadmap_parse_stats),
+        "fallbacks": fallback_engine.snapshot(),
+        "generation": {
+            mode: {
+                "requests": roadmap_generation_stats[f"{mode}_requests"],
+                "avg_seconds": round(roadmap_generation_stats[f"{mode}_seconds"] / roadmap_generation_stats[f"{mode}_requests"], 3)
+                if roadmap_generation_stats[f"{mode}_requests"] else None
+            }
+            for mode in ("single", "fanout")
+        }
+    }
+
+@api_router.get("/indexes")
+async def get_index_report():
+    return await index_report(db)
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        **roadmap_cache.snapshot(),
+        "singleflight": roadmap_singleflight.snapshot(),
+        "hot_roadmaps": hot_roadmaps.snapshot(),
+        "similar_roadmaps": similar_roadmaps.snapshot(),
+        "resource_store": {"mode": ROADMAP_STORAGE_MODE, **resource_store.snapshot()}
+    }
+
+@api_router.get("/analytics/summary")
+async def get_analytics_summary(top: int = Query(20, ge=1, le=ANALYTICS_MAX_TOP)):
+    try:
+        return await analytics_rollups.summary(top)
+    except Exception as e:
+        logging.error(f"Error fetching analytics summary: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics summary")
+
+def require_admin_token(request: Request, action: str):
+    token = request.headers.get("X-Admin-Token", "")
+    if not EXPORT_ADMIN_TOKEN or not secrets.compare_digest(token, EXPORT_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail=f"{action} requires a valid admin token")
+
+@api_router.post("/analytics/rebuild")
+async def rebuild_analytics(request: Request):
+    require_admin_token(request, "Rebuilding analytics")
+    started = analytics_rollups.start_rebuild(db.career_forms, db.career_roadmaps)
+    return JSONResponse(status_code=202 if started else 409, content={
+        "started": started,
+        "rebuild": analytics_rollups.rebuild_status,
+        "status_url": "/api/analytics/summary"
+    })
+
+@api_router.get("/admin/export")
+async def export_career_data(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|parquet)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None
+):
+    require_admin_token(request, "Export")
+    try:
+        query = export_query(since, until, after)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid export cursor")
+
+    # Each NDJSON line carries the cursor to pass as ?after= when a download is cut short
+    batches = export_batches(db.career_forms, db.career_roadmaps, query, EXPORT_BATCH_SIZE, resource_store)
+    if format == EXPORT_PARQUET:
+        if not parquet_available():
+            raise HTTPException(status_code=501, detail="Parquet export needs pandas and pyarrow installed")
+        return StreamingResponse(
+            parquet_chunks(batches),
+            media_type=PARQUET_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="career_roadmaps.parquet"'}
+        )
+    return StreamingResponse(ndjson_chunks(batches), media_type="application/x-ndjson")
+
+@api_router.get("/health/ready")
+async def get_readiness():
+    status = {
+        **readiness,
+        "import_seconds": IMPORT_SECONDS,
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if readiness["ready"]:
+        try:
+            await db.warm_up(timeout_seconds=2)
+        except Exception as e:
+            return JSONResponse(status_code=503, content={**status, "ready": False, "error": str(e)})
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=status)
+
+@api_router.get("/writes/stats")
+async def get_write_stats():
+    return {
+        "career_forms": career_form_writes.snapshot(),
+        "career_roadmaps": career_roadmap_writes.snapshot(),
+        "analytics_rollups": analytics_rollups.snapshot(),
+        "status_checks": status_check_writes.snapshot()
+    }
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    await status_check_writes.insert(status_obj.dict(), wait=not STATUS_CHECK_FIRE_AND_FORGET)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(
+    limit: int = Query(100, ge=1, le=STATUS_PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    query = status_checks_after(after) if after else {}
+    cursor = db.status_checks.find(query, {"_id": 0}).sort([("timestamp", 1), ("id", 1)])
+
+    # NDJSON streams the whole remaining collection straight off the cursor
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_status_checks(cursor.batch_size(STATUS_STREAM_BATCH_SIZE)),
+            media_type="application/x-ndjson"
+        )
+
+    # Fetch one extra document to learn whether another page exists
+    status_checks = [encode_status_check(doc) for doc in await cursor.limit(limit + 1).to_list(limit + 1)]
+    headers = {}
+    if len(status_checks) > limit:
+        status_checks = status_checks[:limit]
+        headers["X-Next-Cursor"] = encode_status_cursor(status_checks[-1])
+    return JSONResponse(content=status_checks, headers=headers)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics_registry.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep roadmap ids out of the label set
+    route = request.scope.get("route")
+    labels = {"method": request.method, "route": getattr(route, "path", "unmatched")}
+    http_request_seconds.observe(time.perf_counter() - started, status=str(response.status_code), **labels)
+    if request.headers.get("content-length"):
+        http_request_bytes.observe(int(request.headers["content-length"]), **labels)
+    if response.headers.get("content-length"):
+        http_response_bytes.observe(int(response.headers["content-length"]), **labels)
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After"],
 )
 
 # Configure logging
@@ -418,6 +1450,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+async def startup_indexes():
+    await ensure_indexes(db)
+    try:
+        await apply_retention(db.status_checks, "timestamp", STATUS_CHECK_RETENTION_DAYS * 86400)
+    except Exception as e:
+        logger.error(f"Failed to apply status check retention: {str(e)}")
+
+async def startup_roadmap_cache():
+    try:
+        await roadmap_cache.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create roadmap cache indexes: {str(e)}")
+
+async def startup_similar_roadmaps():
+    try:
+        await similar_roadmaps.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create roadmap profile indexes: {str(e)}")
+    similar_roadmaps.start()
+
+async def startup_analytics():
+    try:
+        await analytics_rollups.ensure_indexes()
+        # First start against existing data: count what is already stored
+        if not await db.analytics_rollups.find_one({}, {"_id": 1}) and await db.career_forms.find_one({}, {"_id": 1}):
+            analytics_rollups.start_rebuild(db.career_forms, db.career_roadmaps)
+    except Exception as e:
+        logger.error(f"Failed to start analytics rollups: {str(e)}")
+
+async def startup_roadmap_jobs():
+    try:
+        await roadmap_jobs.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create roadmap job indexes: {str(e)}")
+    await roadmap_jobs.start()
+
+async def start_resources():
+    started = time.perf_counter()
+    try:
+        db.connect(min_pool_size=MONGO_MIN_POOL_SIZE)
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.error(f"Failed to configure MongoDB: {str(e)}")
+        return
+
+    # Keep retrying until MongoDB answers; it may still be starting alongside us
+    delay = 0.5
+    while True:
+        try:
+            await db.warm_up()
+            break
+        except Exception as e:
+            readiness["error"] = str(e)
+            logger.error(f"MongoDB is not reachable yet: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    await asyncio.gather(startup_indexes(), startup_roadmap_cache(), startup_similar_roadmaps(), startup_roadmap_jobs(), startup_analytics())
+    readiness.update(ready=True, error=None, ready_seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"Ready in {readiness['ready_seconds']}s")
+
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await roadmap_jobs.stop()
+    await similar_roadmaps.stop()
+    # Drain buffered writes before the client goes away
+    for writes in (career_form_writes, career_roadmap_writes, status_check_writes):
+        try:
+            await writes.stop()
+        except Exception as e:
+            logger.error(f"Failed to drain write-behind buffer: {str(e)}")
+    try:
+        await analytics_rollups.stop()
+    except Exception as e:
+        logger.error(f"Failed to flush analytics rollups: {str(e)}")
+    db.close()
+
+IMPORT_SECONDS = round(time.perf_counter() - IMPORT_STARTED, 3)
+if IMPORT_SECONDS > IMPORT_BUDGET_SECONDS:
+    logger.warning(f"Importing the server took {IMPORT_SECONDS}s, over its {IMPORT_BUDGET_SECONDS}s budget")
\ No newline at end of file
@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Squared block weights of the profile vector. Skills form one TF-IDF block scaled
+# to unit length; year, career interest and learning style are one-hot blocks.
+# A different career interest caps similarity at 0.6, so it can never match.
+SKILL_WEIGHT = 1.0
+YEAR_WEIGHT = 0.25
+INTEREST_WEIGHT = 1.0
+STYLE_WEIGHT = 0.25
+TOTAL_WEIGHT = SKILL_WEIGHT + YEAR_WEIGHT + INTEREST_WEIGHT + STYLE_WEIGHT
+CATEGORY_FIELDS = ("year", "career_interest", "learning_style")
+CATEGORY_WEIGHTS = (YEAR_WEIGHT, INTEREST_WEIGHT, STYLE_WEIGHT)
+KEY_BYTES = 32
+# Profiles read per cursor batch at refresh, and added to the index in one go
+REFRESH_BATCH_SIZE = 5000
+
+
+class ProfileIndex:
+    """Append-only cosine-similarity index over canonical career profiles.
+
+    Storage is columnar and compact: an inverted index of int32 postings per
+    skill, one int32 code column per categorical field and the 32-byte
+    profile keys packed into one bytearray. A query scores every stored
+    profile at once with NumPy.
+
+    IDF weights change as profiles are added, so the skill-block norms of
+    stored rows are recomputed with the current weights whenever the index
+    has grown since the last query; stored rows and queries then always use
+    the same weights and the skill cosine stays within [0, 1].
+
+    Queries and additions take a lock, so both can run in worker threads.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._keys = bytearray()
+        self._skill_ids = {}
+        self._doc_freq = array("i")
+        self._postings = []
+        self._category_ids = [{} for _ in CATEGORY_FIELDS]
+        self._category_codes = [array("i") for _ in CATEGORY_FIELDS]
+        self._skill_norms = np.zeros(0)
+        self._norms_rows = 0
+        self._lock = threading.Lock()
+
+    def _idf(self, doc_freq) -> np.ndarray:
+        return np.log((1 + self.rows) / (1 + np.asarray(doc_freq, dtype=np.float64))) + 1
+
+    def add(self, key: str, profile: dict):
+        with self._lock:
+            self._add(key, profile)
+
+    def add_many(self, profiles: list):
+        """Add (key, profile) pairs under a single acquisition of the lock"""
+        with self._lock:
+            for key, profile in profiles:
+                self._add(key, profile)
+
+    def _add(self, key: str, profile: dict):
+        row = self.rows
+        for skill in profile["skills"]:
+            skill_id = self._skill_ids.get(skill)
+            if skill_id is None:
+                skill_id = self._skill_ids[skill] = len(self._postings)
+                self._postings.append(array("i"))
+                self._doc_freq.append(0)
+            self._postings[skill_id].append(row)
+            self._doc_freq[skill_id] += 1
+
+        for field_index, field in enumerate(CATEGORY_FIELDS):
+            ids = self._category_ids[field_index]
+            self._category_codes[field_index].append(ids.setdefault(profile[field], len(ids)))
+
+        self.rows += 1
+        self._keys += bytes.fromhex(key)
+
+    def _row_norms(self) -> np.ndarray:
+        """Skill-block norm of every stored row under the current IDF weights"""
+        if self._norms_rows != self.rows:
+            # Refreshes add profiles in batches, so this runs about once per refresh, not per query
+            postings = [np.frombuffer(posting, dtype=np.int32) for posting in self._postings]
+            weights = np.repeat(self._idf(self._doc_freq) ** 2, [len(posting) for posting in postings])
+            rows = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32)
+            self._skill_norms = np.sqrt(np.bincount(rows, weights=weights, minlength=self.rows))
+            self._norms_rows = self.rows
+        return self._skill_norms
+
+    def query(self, profile: dict) -> Tuple[Optional[str], float]:
+        """Return the key of the most similar stored profile and its cosine score"""
+        with self._lock:
+            return self._query(profile)
+
+    def _query(self, profile: dict) -> Tuple[Optional[str], float]:
+        if not self.rows:
+            return None, 0.0
+
+        known = [self._skill_ids[skill] for skill in profile["skills"] if skill in self._skill_ids]
+        unknown = len(profile["skills"]) - len(known)
+        known_idf = self._idf([self._doc_freq[skill_id] for skill_id in known])
+        # Skills nobody has had yet still count towards the query's own norm
+        query_norm = math.sqrt(float(np.sum(known_idf ** 2)) + unknown * float(self._idf([0])[0]) ** 2)
+
+        scores = np.zeros(self.rows, dtype=np.float64)
+        if known and query_norm:
+            postings = [np.frombuffer(self._postings[skill_id], dtype=np.int32) for skill_id in known]
+            weights = np.repeat(known_idf ** 2, [len(posting) for posting in postings])
+            dots = np.bincount(np.concatenate(postings), weights=weights, minlength=self.rows)
+            norms = self._row_norms()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                skill_cosine = np.where(norms > 0, dots / (query_norm * norms), 0.0)
+            # Guards against rounding only; with consistent weights the cosine cannot exceed 1
+            scores += SKILL_WEIGHT * np.clip(skill_cosine, 0.0, 1.0)
+
+        for field_index, field in enumerate(CATEGORY_FIELDS):
+            code = self._category_ids[field_index].get(profile[field])
+            if code is not None:
+                codes = np.frombuffer(self._category_codes[field_index], dtype=np.int32)
+                scores += CATEGORY_WEIGHTS[field_index] * (codes == code)
+
+        best = int(np.argmax(scores))
+        key = self._keys[best * KEY_BYTES:(best + 1) * KEY_BYTES].hex()
+        return key, float(scores[best] / TOTAL_WEIGHT)
+
+    def memory_bytes(self) -> int:
+        columns = [self._keys, self._doc_freq, *self._postings, *self._category_codes]
+        return sum(len(column) * getattr(column, "itemsize", 1) for column in columns) + self._skill_norms.nbytes
+
+
+class SimilarRoadmapIndex:
+    """Reuses stored roadmaps for near-identical profiles instead of calling the LLM.
+
+    Generated roadmaps are recorded in a MongoDB collection together with the
+    canonical profile they were made for. Every worker keeps a ProfileIndex
+    over that collection, loaded in the background at startup and topped up
+    incrementally on a timer.
+    """
+
+    def __init__(self, collection, threshold: float = 0.92, refresh_seconds: float = 30.0, variant: str = ""):
+        self.collection = collection
+        # Only roadmaps made by the current prompt setup are reused
+        self.variant = variant
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.index = ProfileIndex()
+        self._watermark = None
+        self._task = None
+        self.stats = {"queries": 0, "hits": 0, "query_seconds": 0.0, "max_query_seconds": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index([("variant", 1), ("created_at", 1)])
+
+    async def record(self, key: str, profile: dict, roadmap_data: dict):
+        # The first roadmap for a profile wins; created_at never moves, so refresh sees each profile once
+        await self.collection.update_one(
+            {"key": key},
+            {"$setOnInsert": {
+                "key": key,
+                "variant": self.variant,
+                "profile": profile,
+                "roadmap": roadmap_data,
+                "created_at": datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+
+    async def find(self, profile: dict) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        started = time.monotonic()
+        # Scoring a large index takes milliseconds of NumPy work, so it stays off the event loop
+        key, score = await asyncio.to_thread(self.index.query, profile)
+        elapsed = time.monotonic() - started
+        self.stats["queries"] += 1
+        self.stats["query_seconds"] += elapsed
+        self.stats["max_query_seconds"] = max(self.stats["max_query_seconds"], elapsed)
+        if key is None or score < self.threshold:
+            return None
+
+        doc = await self.collection.find_one({"key": key}, {"_id": 0, "roadmap": 1})
+        if not doc:
+            return None
+        self.stats["hits"] += 1
+        return doc["roadmap"]
+
+    async def refresh(self) -> int:
+        query = {"variant": self.variant}
+        if self._watermark:
+            query["created_at"] = {"$gt": self._watermark}
+        cursor = self.collection.find(query, {"_id": 0, "key": 1, "profile": 1, "created_at": 1})
+        added = 0
+        batch = []
+        async for doc in cursor.sort("created_at", 1).batch_size(REFRESH_BATCH_SIZE):
+            batch.append(doc)
+            if len(batch) >= REFRESH_BATCH_SIZE:
+                added += await self._add_batch(batch)
+                batch = []
+        if batch:
+            added += await self._add_batch(batch)
+        return added
+
+    async def _add_batch(self, docs: list) -> int:
+        await asyncio.to_thread(self.index.add_many, [(doc["key"], doc["profile"]) for doc in docs])
+        self._watermark = docs[-1]["created_at"]
+        return len(docs)
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Failed to refresh similar roadmap index: {str(e)}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict:
+        queries = self.stats["queries"]
+        return {
+            "threshold": self.threshold,
+            "profiles": self.index.rows,
+            "memory_bytes": self.index.memory_bytes(),
+            "queries": queries,
+            "hits": self.stats["hits"],
+            "hit_rate": round(self.stats["hits"] / queries, 4) if queries else 0.0,
+            "avg_query_ms": round(self.stats["query_seconds"] / queries * 1000, 3) if queries else None,
+            "max_query_ms": round(self.stats["max_query_seconds"] * 1000, 3),
+        }
+
+
+def benchmark(profiles: int = 1_000_000, queries: int = 200, seed: int = 7) -> dict:
+    """Index memory, query latency and hit rate on a synthetic corpus"""
+    import hashlib
+    import random
+
+    rng = random.Random(seed)
+    skills = [f"skill{i}" for i in range(300)]
+    years = ["freshman", "sophomore", "junior", "senior", "graduate"]
+    interests = [f"interest{i}" for i in range(25)]
+    styles = ["visual", "hands-on", "reading", "mixed"]
+
+    def make_profile():
+        return {
+            "skills": sorted(rng.sample(skills, rng.randint(2, 7))),
+            "year": rng.choice(years),
+            "career_interest": rng.choice(interests),
+            "learning_style": rng.choice(styles),
+        }
+
+    index = ProfileIndex()
+    stored = []
+    started = time.monotonic()
+    for i in range(profiles):
+        profile = make_profile()
+        index.add(hashlib.sha256(str(i).encode()).hexdigest(), profile)
+        if i % max(1, profiles // queries) == 0:
+            stored.append(profile)
+    build_seconds = time.monotonic() - started
+
+    # Queries are stored profiles with one extra skill, the "React, Python, Git" case
+    hits = 0
+    latencies = []
+    for profile in stored[:queries]:
+        query = dict(profile, skills=sorted(set(profile["skills"]) | {rng.choice(skills)}))
+        started = time.monotonic()
+        _, score = index.query(query)
+        latencies.append(time.monotonic() - started)
+        hits += score >= 0.92
+    latencies.sort()
+    return {
+        "profiles": profiles,
+        "build_seconds": round(build_seconds, 2),
+        "memory_mb": round(index.memory_bytes() / 1024 / 1024, 1),
+        "query_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "query_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "hit_rate": round(hits / len(latencies), 3),
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    print(json.dumps(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000), indent=2))
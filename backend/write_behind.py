@@ -0,0 +1,123 @@
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+
+class WriteBehindBuffer:
+    """Groups inserts from concurrent requests into shared ``insert_many`` calls.
+
+    Documents are queued and written by one background flusher, either once
+    ``max_batch`` are waiting or ``flush_interval`` seconds after the first one
+    arrived, whichever comes first. ``insert(doc)`` resolves when MongoDB has
+    acknowledged that document; ``insert(doc, wait=False)`` returns straight
+    away and only logs a failed write. ``stop()`` drains whatever is queued.
+    """
+
+    def __init__(self, collection, max_batch: int = 100, flush_interval: float = 0.005):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+        self._stopping = False
+        self.stats = {"inserts": 0, "flushes": 0, "largest_batch": 0, "errors": 0, "dropped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1 and self.flush_interval > 0
+
+    async def insert(self, doc: dict, wait: bool = True):
+        self.stats["inserts"] += 1
+        if not self.enabled or self._stopping:
+            await self._write([(doc, None)], raise_errors=True)
+            return
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((doc, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if future is not None:
+            # The write still happens if this caller goes away
+            await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Write-behind flush to {self.collection.name} failed: {str(e)}")
+            if self._stopping and not self._pending:
+                return
+
+    async def flush(self):
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            if not self._pending:
+                self._has_items.clear()
+                self._full.clear()
+            await self._write(batch)
+
+    async def _write(self, batch, raise_errors: bool = False):
+        self.stats["flushes"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        errors = {}
+        try:
+            if len(batch) == 1:
+                await self.collection.insert_one(batch[0][0])
+            else:
+                await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                error_type = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                errors[error["index"]] = error_type(error.get("errmsg"), error.get("code"), error)
+        except Exception as e:
+            if raise_errors:
+                raise
+            errors = {index: e for index in range(len(batch))}
+
+        self.stats["errors"] += len(errors)
+        for index, (_, future) in enumerate(batch):
+            error = errors.get(index)
+            if future is None:
+                if error is not None:
+                    self.stats["dropped"] += 1
+                    logging.error(f"Unacknowledged insert into {self.collection.name} failed: {str(error)}")
+            elif not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def stop(self):
+        """Stop the flusher and write out everything still queued"""
+        self._stopping = True
+        if self._task is not None:
+            # Wake the flusher rather than cancelling it, so an in-flight batch completes
+            self._has_items.set()
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def snapshot(self) -> dict:
+        flushes = self.stats["flushes"]
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "avg_batch": round(self.stats["inserts"] / flushes, 2) if flushes else 0.0,
+            "max_batch": self.max_batch,
+            "flush_interval": self.flush_interval,
+        }
@@ -0,0 +1,438 @@
+"""Offline load test for the backend.
+
+Boots ``server.app`` in-process with a fake LLM and an in-memory MongoDB
+stand-in (mongomock-motor), drives the main endpoints at increasing
+concurrency and reports time-to-ready, throughput, latency percentiles and fallback rate
+as JSON. With ``--baseline`` the run is compared against an earlier report and
+the script exits non-zero on a regression, so it can gate CI.
+
+    python backend_benchmark.py --concurrency 1,8,32 --output report.json
+    python backend_benchmark.py --baseline report.json --tolerance 0.2
+    python backend_benchmark.py --prompts --llm-ms-per-output-token 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+DEGREES = ["Computer Science", "Information Technology", "Mathematics", "Electrical Engineering", "Business"]
+YEARS = ["freshman", "sophomore", "junior", "senior", "graduate"]
+SKILLS = ["Python", "JavaScript", "React", "SQL", "Java", "C++", "Git", "Docker", "Excel", "Figma",
+          "Statistics", "Linux", "HTML", "CSS", "Node.js", "Pandas", "TypeScript", "AWS", "Go", "Rust"]
+INTERESTS = ["ai-ml", "web-development", "data-science", "cybersecurity", "cloud-computing", "mobile-development"]
+STYLES = ["visual", "hands-on", "reading", "mixed"]
+
+
+def fake_roadmap(phase_count: int = 6) -> dict:
+    phases = [
+        {
+            "phase": f"Months {2 * index + 1}-{2 * index + 2}: Stage {index + 1}",
+            "focus_areas": ["Fundamentals", "Tooling", "Practice"],
+            "learning_resources": [
+                {"title": f"Course {index + 1}", "type": "course", "url": f"https://example.com/course/{index + 1}"},
+                {"title": f"Docs {index + 1}", "type": "documentation", "url": f"https://example.com/docs/{index + 1}"},
+            ],
+            "projects": [
+                {"title": f"Project {index + 1}", "description": "Build something that uses this stage.", "difficulty": "Intermediate"}
+            ],
+        }
+        for index in range(phase_count)
+    ]
+    return {
+        "roadmap": phases,
+        # Fan-out and repair prompts ask for "phases"; one reply shape serves every prompt
+        "phases": phases,
+        "job_roles": ["Junior Engineer", "Analyst", "Associate Developer"],
+        "example_companies": ["Google", "Microsoft", "Stripe", "Shopify", "Atlassian"],
+        "interview_prep": {
+            "important_topics": ["Data Structures", "System Design", "Behavioural"],
+            "resources": [{"title": "Interview Guide", "type": "guide", "url": "https://example.com/interviews"}],
+        },
+    }
+
+
+class FakeLlmConfig:
+    def __init__(self, args):
+        self.median_seconds = args.llm_latency_ms / 1000
+        self.sigma = args.llm_latency_sigma
+        self.seconds_per_input_token = args.llm_ms_per_input_token / 1000
+        self.seconds_per_output_token = args.llm_ms_per_output_token / 1000
+        self.malformed_rate = args.malformed_rate
+        self.stream_chunk_bytes = args.stream_chunk_bytes
+        self.rng = random.Random(args.seed)
+        self.reply = json.dumps(fake_roadmap(args.phases))
+        self.calls = 0
+        self.malformed = 0
+
+    def latency(self, input_tokens: int = 0, output_tokens: int = 0) -> float:
+        # Log-normal: LLM latencies have a long right tail; prompt and reply length add to it
+        base = self.median_seconds * math.exp(self.rng.gauss(0, self.sigma))
+        return base + input_tokens * self.seconds_per_input_token + output_tokens * self.seconds_per_output_token
+
+    def response(self) -> str:
+        self.calls += 1
+        if self.rng.random() >= self.malformed_rate:
+            return self.reply
+        self.malformed += 1
+        if self.rng.random() < 0.5:
+            # Cut off mid-document, as when the model hits its token limit
+            return self.reply[:self.rng.randint(len(self.reply) // 3, len(self.reply) - 10)]
+        return "I'm sorry, I can't produce that roadmap right now."
+
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def make_fake_llm(config: FakeLlmConfig):
+    from prompts import count_tokens
+
+    class FakeLlmChat:
+        def __init__(self, api_key=None, session_id=None, system_message=None):
+            self.session_id = session_id
+            self.max_tokens = None
+
+        def with_model(self, provider, model):
+            return self
+
+        def with_max_tokens(self, max_tokens):
+            self.max_tokens = max_tokens
+            return self
+
+        async def send_message(self, message) -> str:
+            text = config.response()
+            output_tokens = count_tokens(text)
+            if self.max_tokens and output_tokens > self.max_tokens:
+                # The provider stops at the output limit, mid-document
+                text = text[:len(text) * self.max_tokens // output_tokens]
+                output_tokens = self.max_tokens
+            await asyncio.sleep(config.latency(count_tokens(message.text), output_tokens))
+            return text
+
+        async def stream_message(self, message):
+            text = config.response()
+            chunks = max(1, math.ceil(len(text) / config.stream_chunk_bytes))
+            delay = config.latency() / chunks
+            for start in range(0, len(text), config.stream_chunk_bytes):
+                await asyncio.sleep(delay)
+                yield text[start:start + config.stream_chunk_bytes]
+
+    return FakeLlmChat
+
+
+def load_server(config: FakeLlmConfig):
+    """Import the app against the in-memory MongoDB stand-in and the fake LLM"""
+    os.environ.setdefault("MONGO_URL", "mongodb://benchmark")
+    os.environ.setdefault("DB_NAME", "career_mentor_benchmark")
+    # Every benchmark request comes from one client, which the per-client limiter would throttle
+    os.environ.setdefault("CAREER_FORM_RATE_PER_MINUTE", "0")
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient
+
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    started = time.perf_counter()
+    import server
+
+    import_seconds = time.perf_counter() - started
+    # Installed before first use, so the real LLM SDK is never imported
+    server.LlmChat = make_fake_llm(config)
+    server.UserMessage = FakeUserMessage
+    # One INFO line per in-process request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return server, import_seconds
+
+
+def percentile(sorted_values, pct: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(math.ceil(pct / 100 * len(sorted_values))) - 1)]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        **{
+            f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) if latencies else None
+            for pct in (50, 95, 99)
+        },
+    }
+
+
+def fallback_count(metrics_text: str) -> float:
+    total = 0.0
+    for line in metrics_text.splitlines():
+        if line.startswith("career_mentor_roadmap_fallbacks_total{"):
+            total += float(line.rsplit(" ", 1)[1])
+    return total
+
+
+async def run_endpoint(concurrency: int, total: int, send) -> dict:
+    """Issue ``total`` requests through ``send(i)`` from ``concurrency`` workers"""
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                ok = await send(index)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+
+    config = FakeLlmConfig(args)
+    server, import_seconds = load_server(config)
+    rng = random.Random(args.seed)
+    profiles = [
+        {
+            "degree": rng.choice(DEGREES),
+            "year": rng.choice(YEARS),
+            "skills": ", ".join(rng.sample(SKILLS, rng.randint(2, 6))),
+            "career_interest": rng.choice(INTERESTS),
+            "learning_style": rng.choice(STYLES),
+        }
+        for _ in range(args.profiles)
+    ]
+    roadmap_ids = []
+
+    async def career_form(client, index):
+        response = await client.post("/api/career-form", json=rng.choice(profiles))
+        if response.status_code != 200:
+            return False
+        roadmap_ids.append(response.json()["roadmap_id"])
+        return True
+
+    async def career_form_stream(client, index):
+        async with client.stream("POST", "/api/career-form/stream", json=rng.choice(profiles)) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response.status_code == 200
+
+    async def roadmap(client, index):
+        response = await client.get(f"/api/roadmap/{rng.choice(roadmap_ids)}")
+        return response.status_code == 200
+
+    async def status(client, index):
+        response = await client.post("/api/status", json={"client_name": f"benchmark-{index}"})
+        return response.status_code == 200
+
+    endpoints = [("career_form", career_form)]
+    if args.stream:
+        endpoints.append(("career_form_stream", career_form_stream))
+    endpoints += [("roadmap", roadmap), ("status", status)]
+
+    levels = []
+    transport = httpx.ASGITransport(app=server.app)
+    started = time.perf_counter()
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            while True:
+                ready = await client.get("/api/health/ready")
+                if ready.status_code == 200:
+                    break
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError(f"Server did not become ready: {ready.json()}")
+                await asyncio.sleep(0.01)
+            startup = {
+                "import_seconds": round(import_seconds, 3),
+                "ready_seconds": round(time.perf_counter() - started, 3),
+                "max_rss_mb": ready.json()["max_rss_mb"],
+            }
+
+            for concurrency in args.concurrency:
+                level = {"concurrency": concurrency, "endpoints": {}}
+                fallbacks_before = fallback_count((await client.get("/metrics")).text)
+                calls_before = config.calls
+                for name, send in endpoints:
+                    level["endpoints"][name] = await run_endpoint(
+                        concurrency, args.requests, lambda index, send=send: send(client, index)
+                    )
+                fallbacks = fallback_count((await client.get("/metrics")).text) - fallbacks_before
+                generated = level["endpoints"]["career_form"]["requests"]
+                level["fallback_rate"] = round(fallbacks / generated, 4) if generated else 0.0
+                level["llm_calls"] = config.calls - calls_before
+                levels.append(level)
+                print(f"concurrency {concurrency}: " + ", ".join(
+                    f"{name} {stats['throughput_rps']} rps p99 {stats['p99_ms']} ms"
+                    for name, stats in level["endpoints"].items()
+                ), file=sys.stderr)
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "profiles": args.profiles,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_latency_sigma": args.llm_latency_sigma,
+            "llm_ms_per_input_token": args.llm_ms_per_input_token,
+            "llm_ms_per_output_token": args.llm_ms_per_output_token,
+            "phases": args.phases,
+            "malformed_rate": args.malformed_rate,
+            "stream": args.stream,
+            "seed": args.seed,
+        },
+        "startup": startup,
+        "levels": levels,
+    }
+
+
+async def run_prompt_benchmark(args) -> dict:
+    """Input/output tokens, parse success and latency of each roadmap prompt version.
+
+    Every profile's prompt is compiled per version and sent to the fake LLM
+    with that version's output token limit. The fake's reply does not depend
+    on the prompt, so output-length effects of a prompt need the real model;
+    what this measures is prompt size, whether the output budget holds a full
+    roadmap, and the latency those imply.
+    """
+    from prompts import PROMPT_TEMPLATES, compile_roadmap_prompt, count_tokens, tokenizer_name
+    from roadmap_parsing import extract_json_object
+
+    config = FakeLlmConfig(args)
+    server, _ = load_server(config)
+    rng = random.Random(args.seed)
+    profiles = [
+        server.CareerFormInput(
+            degree=rng.choice(DEGREES),
+            year=rng.choice(YEARS),
+            skills=", ".join(rng.sample(SKILLS, rng.randint(2, 6))),
+            career_interest=rng.choice(INTERESTS),
+            learning_style=rng.choice(STYLES),
+        )
+        for _ in range(args.requests)
+    ]
+
+    async def generate(form, version):
+        prompt = compile_roadmap_prompt(
+            server.format_profile(form), form.career_interest, form.learning_style, args.phases, version
+        )
+        chat = server.create_roadmap_chat(form, max_tokens=prompt.max_output_tokens)
+        started = time.perf_counter()
+        reply = await chat.send_message(FakeUserMessage(prompt.text))
+        latency = time.perf_counter() - started
+        try:
+            data, _ = extract_json_object(reply)
+            _, invalid_sections, invalid_phases = server.validate_roadmap_sections(data)
+            parsed = not invalid_sections and not invalid_phases
+        except ValueError:
+            parsed = False
+        return prompt, count_tokens(reply), latency, parsed
+
+    versions = {}
+    for version in args.prompt_versions or list(PROMPT_TEMPLATES):
+        results = await asyncio.gather(*[generate(form, version) for form in profiles])
+        input_tokens = sorted(prompt.input_tokens for prompt, _, _, _ in results)
+        latencies = sorted(latency for _, _, latency, _ in results)
+        versions[version] = {
+            "input_tokens_mean": round(sum(input_tokens) / len(input_tokens), 1),
+            "input_tokens_p95": percentile(input_tokens, 95),
+            "output_tokens_mean": round(sum(output for _, output, _, _ in results) / len(results), 1),
+            "max_output_tokens": results[0][0].max_output_tokens,
+            "parse_success_rate": round(sum(parsed for _, _, _, parsed in results) / len(results), 4),
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "latency_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        }
+    return {"tokenizer": tokenizer_name(), "profiles": len(profiles), "phases": args.phases, "versions": versions}
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of throughput and tail latency beyond ``tolerance`` (a fraction)"""
+    regressions = []
+    for key, value in report["startup"].items():
+        before = baseline.get("startup", {}).get(key)
+        if before and value > before * (1 + tolerance):
+            regressions.append(f"startup {key}: {value} > baseline {before}")
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        previous = baseline_levels.get(level["concurrency"])
+        if previous is None:
+            continue
+        for name, stats in level["endpoints"].items():
+            before = previous["endpoints"].get(name)
+            if before is None:
+                continue
+            where = f"{name} at concurrency {level['concurrency']}"
+            if before["throughput_rps"] and stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{where}: throughput {stats['throughput_rps']} rps < baseline {before['throughput_rps']} rps")
+            for key in ("p95_ms", "p99_ms"):
+                if before[key] and stats[key] and stats[key] > before[key] * (1 + tolerance):
+                    regressions.append(f"{where}: {key} {stats[key]} > baseline {before[key]}")
+        if level["fallback_rate"] > previous["fallback_rate"] + tolerance / 10:
+            regressions.append(
+                f"fallback rate at concurrency {level['concurrency']}: {level['fallback_rate']} > baseline {previous['fallback_rate']}"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="In-process load test with a fake LLM and in-memory MongoDB")
+    parser.add_argument("--concurrency", default="1,8,32,64", type=lambda value: [int(part) for part in value.split(",")],
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint per level")
+    parser.add_argument("--profiles", type=int, default=5000, help="distinct student profiles to draw from")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="median fake LLM latency")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5, help="log-normal spread of fake LLM latency")
+    parser.add_argument("--llm-ms-per-input-token", type=float, default=0.05, help="fake LLM latency added per prompt token")
+    parser.add_argument("--llm-ms-per-output-token", type=float, default=0.0, help="fake LLM latency added per reply token")
+    parser.add_argument("--phases", type=int, default=6, help="phases in the fake LLM's roadmap replies")
+    parser.add_argument("--prompts", action="store_true",
+                        help="compare roadmap prompt versions instead of running the load test")
+    parser.add_argument("--prompt-versions", default=None, type=lambda value: value.split(","),
+                        help="comma-separated prompt versions for --prompts (default: all)")
+    parser.add_argument("--malformed-rate", type=float, default=0.05, help="share of fake LLM replies that are not clean JSON")
+    parser.add_argument("--stream", action="store_true", help="also drive /api/career-form/stream")
+    parser.add_argument("--stream-chunk-bytes", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run_prompt_benchmark(args) if args.prompts else run_benchmark(args))
+
+    if args.baseline and not args.prompts:
+        report["regressions"] = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
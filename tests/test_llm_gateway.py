@@ -0,0 +1,121 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from llm_gateway import BREAKER_CLOSED, BREAKER_OPEN, CircuitBreaker, CircuitOpenError, LlmGateway  # noqa: E402
+
+
+class SlowChat:
+    def __init__(self, seconds: float, reply: str = "ok"):
+        self.seconds = seconds
+        self.reply = reply
+        self.calls = 0
+
+    async def send_message(self, message):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return self.reply
+
+
+def half_open_gateway(**kwargs) -> LlmGateway:
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=5.0, cooldown_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    return LlmGateway(breaker=breaker, hedge_delay_seconds=0.05, **kwargs)
+
+
+def test_refused_hedge_does_not_cancel_probe_call():
+    gateway = half_open_gateway()
+    chat = SlowChat(0.2)
+
+    async def run():
+        return await gateway.send_hedged(lambda: gateway.send(chat, "hi"), budget_seconds=2.0)
+
+    assert asyncio.run(run()) == "ok"
+    assert gateway.breaker.state == BREAKER_CLOSED
+    assert gateway.hedge_stats["primary_wins"] == 1
+
+
+def test_breaker_recovers_when_provider_is_slower_than_hedge_delay():
+    gateway = half_open_gateway()
+    chat = SlowChat(0.1)
+
+    async def run():
+        return [await gateway.send_hedged(lambda: gateway.send(chat, "hi"), budget_seconds=2.0) for _ in range(3)]
+
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+    assert gateway.breaker.state == BREAKER_CLOSED
+
+
+def test_open_breaker_raises_without_calling_provider():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60.0)
+    breaker.record_failure()
+    gateway = LlmGateway(breaker=breaker, hedge_delay_seconds=0.05)
+    chat = SlowChat(0.0)
+
+    async def run():
+        return await gateway.send_hedged(lambda: gateway.send(chat, "hi"), budget_seconds=1.0)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(run())
+    assert chat.calls == 0
+
+
+def test_hedge_wins_over_slow_primary():
+    gateway = LlmGateway(hedge_delay_seconds=0.05)
+    chats = iter([SlowChat(1.0, "primary"), SlowChat(0.0, "hedge")])
+
+    async def run():
+        return await gateway.send_hedged(lambda: gateway.send(next(chats), "hi"), budget_seconds=2.0)
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == "hedge"
+    assert time.monotonic() - started < 0.5
+    assert gateway.hedge_stats["hedge_wins"] == 1
+    assert gateway.breaker.state == BREAKER_CLOSED
+
+
+def test_queue_time_does_not_trigger_hedges():
+    gateway = LlmGateway(max_concurrency=4, hedge_delay_seconds=0.15, hedge_max_rate=1.0)
+
+    async def run():
+        chat = SlowChat(0.1)
+        return await asyncio.gather(
+            *(gateway.send_hedged(lambda: gateway.send(chat, "hi"), budget_seconds=5.0) for _ in range(40))
+        )
+
+    assert asyncio.run(run()) == ["ok"] * 40
+    assert gateway.hedge_stats["hedges"] == 0
+
+
+def test_no_hedge_while_callers_queue_for_a_slot():
+    gateway = LlmGateway(max_concurrency=2, hedge_delay_seconds=0.05, hedge_max_rate=1.0)
+
+    async def run():
+        slow = SlowChat(0.3)
+        return await asyncio.gather(
+            *(gateway.send_hedged(lambda: gateway.send(slow, "hi"), budget_seconds=5.0) for _ in range(3))
+        )
+
+    asyncio.run(run())
+    # The first two hold both slots while the third queues; it may hedge once it is served alone
+    assert gateway.hedge_stats["hedges_skipped"] == 2
+    assert gateway.hedge_stats["hedges"] <= 1
+
+
+def test_hedge_rate_is_capped():
+    gateway = LlmGateway(hedge_delay_seconds=0.01, hedge_max_rate=0.25)
+
+    async def run():
+        chat = SlowChat(0.05)
+        for _ in range(20):
+            await gateway.send_hedged(lambda: gateway.send(chat, "hi"), budget_seconds=2.0)
+
+    asyncio.run(run())
+    assert gateway.hedge_stats["hedges"] == 5
+    assert gateway.hedge_stats["hedges_skipped"] == 15
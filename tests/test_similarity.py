@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from similarity import ProfileIndex  # noqa: E402
+
+
+def profile_key(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def profile(skills, career_interest="web-dev", year="junior", learning_style="projects") -> dict:
+    return {
+        "degree": "computer science",
+        "year": year,
+        "skills": sorted(skills),
+        "career_interest": career_interest,
+        "learning_style": learning_style,
+    }
+
+
+def test_scores_stay_bounded_after_idf_drift():
+    index = ProfileIndex()
+    # A rare skill is added first, while its IDF is still low
+    index.add(profile_key("rare"), profile(["elm"]))
+    for row in range(2000):
+        index.add(profile_key(f"filler-{row}"), profile([f"skill-{row % 50}"], career_interest="data-science", year="senior"))
+
+    key, score = index.query(profile(["elm"], career_interest="cybersecurity", year="freshman", learning_style="projects"))
+
+    assert key == profile_key("rare")
+    assert score <= 0.6 + 1e-9
+
+
+def test_different_career_interest_caps_score():
+    index = ProfileIndex()
+    index.add(profile_key("web"), profile(["html", "css", "javascript"]))
+
+    _, same = index.query(profile(["html", "css", "javascript"]))
+    _, other = index.query(profile(["html", "css", "javascript"], career_interest="ai-ml"))
+
+    assert abs(same - 1.0) < 1e-9
+    assert abs(other - 0.6) < 1e-9
+
+
+def test_identical_profile_scores_one_as_index_grows():
+    index = ProfileIndex()
+    index.add(profile_key("target"), profile(["python", "sql"]))
+    for row in range(500):
+        index.add(profile_key(f"filler-{row}"), profile(["python"], career_interest="ai-ml"))
+        _, score = index.query(profile(["python", "sql"]))
+        assert score <= 1.0 + 1e-9
+
+    key, score = index.query(profile(["python", "sql"]))
+    assert key == profile_key("target")
+    assert abs(score - 1.0) < 1e-9
+
+
+def test_queries_from_threads_while_adding():
+    index = ProfileIndex()
+    index.add(profile_key("target"), profile(["python", "sql"]))
+    batches = [
+        [(profile_key(f"filler-{batch}-{row}"), profile([f"skill-{row % 20}"])) for row in range(200)]
+        for batch in range(10)
+    ]
+
+    async def run():
+        adding = [asyncio.to_thread(index.add_many, batch) for batch in batches]
+        querying = [asyncio.to_thread(index.query, profile(["python", "sql"])) for _ in range(20)]
+        return await asyncio.gather(*adding, *querying)
+
+    results = asyncio.run(run())[len(batches):]
+    assert index.rows == 2001
+    assert all(key == profile_key("target") and abs(score - 1.0) < 1e-9 for key, score in results)